@@ -0,0 +1,415 @@
+"""Benchmarks of the remotes provided by pytest-servers.
+
+Measures, per backend:
+
+- cold and warm startup of the mock remotes,
+- `mktemp` latency, with and without versioning,
+- small-object PUT/GET rate, large-object throughput and the time to list
+  10k keys.
+
+Usage::
+
+    nox -s bench
+    nox -s bench -- --save benchmarks/baseline.json
+    nox -s bench -- --compare benchmarks/baseline.json
+    nox -s bench -- --s3-backend server inprocess --compare benchmarks/baseline.json
+
+The s3 benchmarks run once per `--s3-backend`, see the `backend` key of
+`s3_server_config`. The results of the server backend are named after the
+remote (`mktemp.s3`), the others after the backend (`mktemp.s3-inprocess`).
+
+The azurite and fake-gcs-server benchmarks need docker, and replace the
+containers of those remotes. Backends that cannot be started are reported
+and skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from functools import partial
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from upath import UPath
+
+    from pytest_servers.factory import TempUPathFactory
+
+BACKENDS = ("local", "memory", "s3", "azure", "gcs")
+# the keys of pytest_servers.s3.S3_BACKENDS, without importing moto
+S3_BACKENDS = ("server", "process", "inprocess")
+# versioning is only supported by these
+VERSIONED = ("s3", "gcs")
+
+# units where a larger value is better, all others are durations
+HIGHER_IS_BETTER = {"ops/s", "MB/s"}
+
+
+class Results:
+    """Collected measurements, keyed by benchmark name."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, dict[str, Any]] = {}
+        self.skipped: dict[str, str] = {}
+
+    def add(self, name: str, value: float, unit: str) -> None:
+        self.data[name] = {"value": value, "unit": unit}
+        print(f"{name:<40} {value:>12.6g} {unit}")
+
+    def skip(self, name: str, reason: str) -> None:
+        self.skipped[name] = reason
+        print(f"{name:<40} skipped: {reason}")
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "machine": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "versions": {
+                package: _version(package)
+                for package in ("pytest-servers", "moto", "fsspec", "universal-pathlib")
+            },
+            "results": self.data,
+            "skipped": self.skipped,
+        }
+
+
+def _version(package: str) -> str | None:
+    try:
+        return version(package)
+    except PackageNotFoundError:
+        return None
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def median_time(fn: Callable[[], Any], rounds: int) -> float:
+    return statistics.median(timed(fn) for _ in range(rounds))
+
+
+def s3_label(s3_backend: str) -> str:
+    """Name of the results of the s3 benchmarks with `s3_backend`."""
+    return "s3" if s3_backend == "server" else f"s3-{s3_backend}"
+
+
+def bench_s3_startup(
+    results: Results,
+    stack: ExitStack,
+    s3_backend: str,
+) -> dict[str, Any]:
+    """Start the moto `s3_backend`, once cold and once warm.
+
+    Returns the configuration of the factory using it.
+    """
+    from pytest_servers.s3 import MOTO_CREDENTIALS, is_moto_healthy, start_s3_server
+
+    def start() -> Any:  # noqa: ANN401
+        _, server = start_s3_server({"backend": s3_backend, **options})
+        if server.endpoint_url:
+            # the first request loads the moto backends
+            is_moto_healthy(server.endpoint_url)
+        return server
+
+    options = {} if s3_backend == "inprocess" else {"verbose": False}
+    name = "startup.s3_server" + ("" if s3_backend == "server" else f".{s3_backend}")
+    # cold includes importing moto and its server, for the first backend
+    cold_start = time.perf_counter()
+    server = start()
+    results.add(f"{name}.cold", time.perf_counter() - cold_start, "s")
+    server.stop()
+    warm_start = time.perf_counter()
+    server = start()
+    results.add(f"{name}.warm", time.perf_counter() - warm_start, "s")
+    stack.callback(server.stop)
+    return {
+        "s3_client_kwargs": {"endpoint_url": server.endpoint_url, **MOTO_CREDENTIALS}
+    }
+
+
+def bench_startup(results: Results, stack: ExitStack) -> dict[str, Any]:
+    """Start the container remotes, once cold and once warm.
+
+    Returns the configuration of the factory using them.
+    """
+    config: dict[str, Any] = {}
+
+    try:
+        import docker
+
+        client = docker.from_env()
+    except Exception as exc:  # noqa: BLE001
+        for name in ("azurite", "fake_gcs_server"):
+            for state in ("cold", "warm"):
+                results.skip(f"startup.{name}.{state}", f"docker: {exc}")
+        return config
+    stack.callback(client.close)
+
+    from pytest_servers.azure import AZURITE_CONTAINER, start_azurite
+    from pytest_servers.containers import remove_container
+    from pytest_servers.gcs import GCS_CONTAINER, start_fake_gcs_server
+
+    lock_dir = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+    remotes = (
+        ("azurite", AZURITE_CONTAINER, start_azurite, "azure_connection_string"),
+        ("fake_gcs_server", GCS_CONTAINER, start_fake_gcs_server, "gcs_endpoint_url"),
+    )
+    for name, container, start, option in remotes:
+        remove_container(client, container)
+        try:
+            # cold: a new container, warm: the running one is reused
+            results.add(
+                f"startup.{name}.cold",
+                timed(partial(start, client, lock_dir)),
+                "s",
+            )
+            warm_start = time.perf_counter()
+            config[option] = start(client, lock_dir)
+            results.add(
+                f"startup.{name}.warm",
+                time.perf_counter() - warm_start,
+                "s",
+            )
+        except Exception as exc:  # noqa: BLE001
+            results.skip(f"startup.{name}", str(exc))
+            continue
+        stack.callback(remove_container, client, container)
+    return config
+
+
+def available_backends(config: dict[str, Any]) -> Iterator[str]:
+    yield from ("local", "memory")
+    if "azure_connection_string" in config:
+        yield "azure"
+    if "gcs_endpoint_url" in config:
+        yield "gcs"
+
+
+def bench_mktemp(
+    results: Results,
+    factory: TempUPathFactory,
+    backend: str,
+    rounds: int,
+    *,
+    label: str | None = None,
+) -> None:
+    for version_aware in (False, True):
+        if version_aware and backend not in VERSIONED:
+            continue
+        name = f"mktemp.{label or backend}" + (".versioned" if version_aware else "")
+        with factory.scope():
+            value = median_time(
+                partial(factory.mktemp, backend, version_aware=version_aware),
+                rounds,
+            )
+        results.add(name, value, "s")
+
+
+def bench_data(  # noqa: PLR0913
+    results: Results,
+    factory: TempUPathFactory,
+    backend: str,
+    *,
+    small_objects: int,
+    large_size: int,
+    list_keys: int,
+    label: str | None = None,
+) -> None:
+    label = label or backend
+    with factory.scope():
+        path: UPath = factory.mktemp(backend)
+        fs = path.fs
+        small = [(path / f"small-{i}").path for i in range(small_objects)]
+
+        def put_small() -> None:
+            for key in small:
+                fs.pipe_file(key, b"x" * 1024)
+
+        def get_small() -> None:
+            for key in small:
+                fs.cat_file(key)
+
+        results.add(
+            f"data.{label}.small_put",
+            small_objects / timed(put_small),
+            "ops/s",
+        )
+        results.add(
+            f"data.{label}.small_get",
+            small_objects / timed(get_small),
+            "ops/s",
+        )
+
+        large = (path / "large").path
+        data = os.urandom(large_size)
+        megabytes = large_size / 1e6
+        results.add(
+            f"data.{label}.large_put",
+            megabytes / timed(lambda: fs.pipe_file(large, data)),
+            "MB/s",
+        )
+        results.add(
+            f"data.{label}.large_get",
+            megabytes / timed(lambda: fs.cat_file(large)),
+            "MB/s",
+        )
+
+        listing = path / "listing"
+        factory.populate(listing, ((str(i), b"") for i in range(list_keys)))
+
+        def find() -> None:
+            fs.invalidate_cache()
+            fs.find(listing.path)
+
+        results.add(f"data.{label}.list_{list_keys}", timed(find), "s")
+
+
+def compare(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    threshold: float,
+) -> list[str]:
+    """Report the change of every result against the baseline.
+
+    Returns the names of the results that are worse by more than `threshold`.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]["value"], result["value"]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if result["unit"] in HIGHER_IS_BETTER else change
+        flag = ""
+        if worse > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40} {old:>12.6g} -> {new:>12.6g} ({change:+.1%}){flag}")
+    return regressions
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=BACKENDS,
+        default=list(BACKENDS),
+        help="backends of the mktemp and data benchmarks",
+    )
+    parser.add_argument(
+        "--s3-backend",
+        dest="s3_backends",
+        nargs="+",
+        choices=S3_BACKENDS,
+        default=["server"],
+        help="moto backends of the s3 benchmarks (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=20,
+        help="repetitions of the latency benchmarks, the median is reported",
+    )
+    parser.add_argument("--small-objects", type=int, default=500)
+    parser.add_argument("--large-size", type=int, default=64 * 2**20)
+    parser.add_argument("--list-keys", type=int, default=10_000)
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help="write the results to this file (default: print them only)",
+    )
+    parser.add_argument(
+        "--save",
+        type=Path,
+        metavar="BASELINE",
+        help="store the results as the baseline",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        metavar="BASELINE",
+        help="compare the results against a stored baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="relative change reported as a regression (default: %(default)s)",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = get_parser().parse_args(argv)
+
+    from pytest_servers.factory import TempUPathFactory
+
+    results = Results()
+    bench = partial(
+        bench_data,
+        small_objects=args.small_objects,
+        large_size=args.large_size,
+        list_keys=args.list_keys,
+    )
+    with ExitStack() as stack:
+        # local paths are created with tempfile outside of pytest
+        tempfile.tempdir = stack.enter_context(tempfile.TemporaryDirectory())
+        config = bench_startup(results, stack)
+        factory = TempUPathFactory(**config)
+        stack.callback(factory.close)
+        available = set(available_backends(config))
+        for backend in args.backends:
+            if backend == "s3":
+                continue
+            if backend not in available:
+                results.skip(f"{backend}", "remote not available")
+                continue
+            bench_mktemp(results, factory, backend, args.rounds)
+            bench(results, factory, backend)
+
+        # one at a time, the inprocess backend intercepts every boto client
+        for s3_backend in args.s3_backends:
+            with ExitStack() as s3_stack:
+                s3_config = bench_s3_startup(results, s3_stack, s3_backend)
+                if "s3" not in args.backends:
+                    continue
+                s3_factory = TempUPathFactory(**config, **s3_config)
+                s3_stack.callback(s3_factory.close)
+                label = s3_label(s3_backend)
+                bench_mktemp(results, s3_factory, "s3", args.rounds, label=label)
+                bench(results, s3_factory, "s3", label=label)
+
+    output = json.dumps(results.to_json(), indent=2) + "\n"
+    for path in filter(None, (args.output, args.save)):
+        path.write_text(output)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        if regressions := compare(results.data, baseline, args.threshold):
+            print(f"{len(regressions)} regressions", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
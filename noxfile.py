@@ -39,6 +39,13 @@ def lint(session: nox.Session) -> None:
     session.run("python", "-m", "mypy")
 
 
+@nox.session
+def bench(session: nox.Session) -> None:
+    """Run the benchmarks, see benchmarks/bench.py for the arguments."""
+    session.install(".[all]")
+    session.run("python", "benchmarks/bench.py", *session.posargs)
+
+
 @nox.session
 def build(session: nox.Session) -> None:
     session.install("build", "setuptools", "twine")
@@ -1,18 +1,22 @@
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING
+from functools import partial
+from typing import TYPE_CHECKING, Any
 
-import pytest
 import requests
-from filelock import FileLock
 
-from .exceptions import HealthcheckTimeout
-from .utils import wait_until, wait_until_running
+from .containers import container_config, run_remote, start_remote
+from .services import get_service
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping
+    from pathlib import Path
+
+    import pytest
     from docker import DockerClient
-    from docker.models import Container
+
+    from .containers import ContainerConfig
 
 AZURITE_PORT = 10000
 AZURITE_URL = "http://localhost:{port}"
@@ -20,58 +24,88 @@ AZURITE_ACCOUNT_NAME = "devstoreaccount1"
 AZURITE_KEY = "Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=="  # noqa: E501
 AZURITE_ENDPOINT = f"{AZURITE_URL}/{AZURITE_ACCOUNT_NAME}"
 AZURITE_CONNECTION_STRING = f"DefaultEndpointsProtocol=http;AccountName={AZURITE_ACCOUNT_NAME};AccountKey={AZURITE_KEY};BlobEndpoint={AZURITE_ENDPOINT};"  # noqa: E501
+AZURITE_READY_LOG = r"Blob service is successfully listening"
+AZURITE_IMAGE = "mcr.microsoft.com/azure-storage/azurite:3.35.0"  # renovate
+AZURITE_COMMAND = "azurite-blob --loose --blobHost 0.0.0.0 --skipApiVersionCheck"
+AZURITE_CONTAINER = "pytest-servers-azurite"
 
 logger = logging.getLogger(__name__)
 
 
-@pytest.fixture(scope="session")
-def azurite(
+def _is_healthy(port: str) -> bool:
+    r = requests.get(AZURITE_URL.format(port=port), timeout=1)
+    return (
+        r.status_code == 400
+        and "Server" in r.headers
+        and "Azurite" in r.headers["Server"]
+    )
+
+
+def azurite_service() -> str | None:
+    """Return the connection string of the azurite started by ``pytest-servers up``."""
+    info = get_service("azure", lambda info: _is_healthy(info["port"]))
+    return info["connection_string"] if info else None
+
+
+def azurite_container(config: Mapping[str, Any] | None = None) -> ContainerConfig:
+    """Return the container of azurite with the given `azurite_config`."""
+    return container_config(
+        AZURITE_CONTAINER,
+        AZURITE_IMAGE,
+        AZURITE_COMMAND,
+        [AZURITE_PORT],
+        config,
+    )
+
+
+def start_azurite(
     docker_client: DockerClient,
-    tmp_path_factory: pytest.TempPathFactory,
+    lock_dir: Path,
+    *,
+    persistent: bool = False,
+    config: Mapping[str, Any] | None = None,
 ) -> str:
-    """Spins up an azurite container. Returns the connection string."""
-    from docker.errors import NotFound
-
-    container_name = "pytest-servers-azurite"
-
-    root_tmp_dir = tmp_path_factory.getbasetemp().parent
-    azurite_lock = root_tmp_dir / "azurite.lock"
-
-    with FileLock(azurite_lock):
-        try:
-            container: Container = docker_client.containers.get(container_name)
-        except NotFound:
-            container = docker_client.containers.run(
-                "mcr.microsoft.com/azure-storage/azurite:3.35.0",  # renovate
-                command="azurite-blob --loose --blobHost 0.0.0.0 --skipApiVersionCheck",
-                name=container_name,
-                stdout=True,
-                stderr=True,
-                detach=True,
-                remove=True,
-                ports={f"{AZURITE_PORT}/tcp": None},  # assign a random port
-            )
-
-        wait_until_running(container)
-        port = container.ports.get(f"{AZURITE_PORT}/tcp")[0]["HostPort"]
-
-    def is_healthy() -> bool:
-        r = requests.get(AZURITE_URL.format(port=port), timeout=3)
-        return (
-            r.status_code == 400
-            and "Server" in r.headers
-            and "Azurite" in r.headers["Server"]
-        )
-
-    try:
-        wait_until(
-            is_healthy,
-            timeout=30,
-        )
-    except TimeoutError:
-        raise HealthcheckTimeout(
-            container.name,
-            container.logs().decode(),
-        ) from None
+    """Start an azurite container, or reuse a running one.
+
+    With `persistent`, the container is kept running after the session (see
+    :mod:`pytest_servers.containers`). `config` is the `azurite_config`.
 
+    Returns the connection string.
+    """
+    port = start_remote(
+        docker_client,
+        azurite_container(config),
+        lock_dir,
+        _is_healthy,
+        name="azurite",
+        command=AZURITE_COMMAND,
+        port=AZURITE_PORT,
+        ready_log=AZURITE_READY_LOG,
+        persistent=persistent,
+    )
     return AZURITE_CONNECTION_STRING.format(port=port)
+
+
+def run_azurite(
+    docker_client: DockerClient,
+    tmp_path_factory: pytest.TempPathFactory,
+    request: pytest.FixtureRequest,
+    azurite_config: dict,
+) -> Iterator[str]:
+    """Spin up an azurite container for the `azurite` fixture.
+
+    Yields the connection string.
+    """
+    yield from run_remote(
+        request,
+        azurite_container(azurite_config),
+        partial(
+            start_azurite,
+            docker_client,
+            tmp_path_factory.getbasetemp().parent,
+            config=azurite_config,
+        ),
+        name="azurite",
+        # `pytest-servers up` starts the default configuration
+        service=None if azurite_config else azurite_service,
+    )
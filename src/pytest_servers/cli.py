@@ -0,0 +1,204 @@
+"""``pytest-servers`` command: manage the mock remotes outside of pytest.
+
+``up`` starts the remotes in the background and records their endpoints,
+which the plugin then uses instead of starting remotes of its own.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+from .services import SERVICES, read_services, remove_service, save_service
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from docker import DockerClient
+
+DOCKER_SERVICES = ("azure", "gcs")
+
+
+def _images() -> dict[str, str]:
+    from .azure import AZURITE_IMAGE
+    from .gcs import GCS_IMAGE
+
+    return {"azure": AZURITE_IMAGE, "gcs": GCS_IMAGE}
+
+
+def _docker_client() -> DockerClient:
+    import docker
+
+    return docker.from_env()
+
+
+def _run_concurrently(
+    fn: Callable[[str], str],
+    services: Sequence[str],
+) -> bool:
+    """Run `fn` for every service concurrently and report the results."""
+    if not services:
+        return True
+    ok = True
+    with ThreadPoolExecutor(max_workers=len(services)) as executor:
+        futures = {service: executor.submit(fn, service) for service in services}
+        for service, future in futures.items():
+            try:
+                print(f"{service}: {future.result()}")  # noqa: T201
+            except Exception as exc:  # noqa: BLE001, PERF203
+                print(f"{service}: failed: {exc}", file=sys.stderr)  # noqa: T201
+                ok = False
+    return ok
+
+
+def pull(services: Sequence[str]) -> bool:
+    """Pull the docker images of `services`."""
+    services = [service for service in services if service in DOCKER_SERVICES]
+    if not services:
+        return True
+    images = _images()
+    client = _docker_client()
+
+    def _pull(service: str) -> str:
+        image = images[service]
+        client.images.pull(image)
+        return f"pulled {image}"
+
+    return _run_concurrently(_pull, services)
+
+
+def up(services: Sequence[str]) -> bool:
+    """Start `services` in the background and record their endpoints."""
+    from .containers import read_state, state_dir
+
+    # images are pulled concurrently, rather than one after the other by
+    # the containers that need them
+    docker_services = [service for service in services if service in DOCKER_SERVICES]
+    if not pull(docker_services):
+        return False
+    client = _docker_client() if docker_services else None
+
+    def _up(service: str) -> str:
+        info: dict[str, Any]
+        if service == "s3":
+            from .s3 import MockedS3ServerProcess, s3_service
+
+            if endpoint_url := s3_service():
+                return f"already running at {endpoint_url}"
+            server = MockedS3ServerProcess(verbose=False, detach=True)
+            server.start()
+            info = {"endpoint_url": server.endpoint_url, "pid": server.pid}
+            endpoint = server.endpoint_url
+        elif service == "azure":
+            from .azure import AZURITE_CONTAINER, start_azurite
+
+            connection_string = start_azurite(client, state_dir(), persistent=True)
+            # persistent containers cache their port
+            port = read_state(AZURITE_CONTAINER)["port"]  # type: ignore[index]
+            info = {"connection_string": connection_string, "port": port}
+            endpoint = f"port {port}"
+        else:
+            from .gcs import GCS_CONTAINER, start_fake_gcs_server
+
+            endpoint_url = start_fake_gcs_server(client, state_dir(), persistent=True)
+            port = read_state(GCS_CONTAINER)["port"]  # type: ignore[index]
+            info = {"endpoint_url": endpoint_url, "port": port}
+            endpoint = endpoint_url
+        save_service(service, **info)
+        return f"running at {endpoint}"
+
+    return _run_concurrently(_up, services)
+
+
+def status(services: Sequence[str]) -> bool:
+    """Report whether `services` are up."""
+    from .azure import azurite_service
+    from .gcs import fake_gcs_server_service
+    from .s3 import s3_service
+
+    probes = {
+        "s3": s3_service,
+        "azure": azurite_service,
+        "gcs": fake_gcs_server_service,
+    }
+    recorded = read_services()
+    ok = True
+    for service in services:
+        if service not in recorded:
+            print(f"{service}: down")  # noqa: T201
+            ok = False
+        elif endpoint := probes[service]():
+            print(f"{service}: up: {endpoint}")  # noqa: T201
+        else:
+            print(f"{service}: not responding")  # noqa: T201
+            ok = False
+    return ok
+
+
+def down(services: Sequence[str]) -> bool:
+    """Stop `services`."""
+
+    def _down(service: str) -> str:
+        info = remove_service(service)
+        if service == "s3":
+            if info is None:
+                return "not running"
+            try:
+                os.kill(info["pid"], signal.SIGTERM)
+            except OSError:
+                return "not running"
+            return "stopped"
+
+        from docker.errors import DockerException
+
+        from .azure import AZURITE_CONTAINER
+        from .containers import remove_container
+        from .gcs import GCS_CONTAINER
+
+        try:
+            client = _docker_client()
+        except DockerException:
+            if info is None:
+                return "not running"
+            raise
+        name = AZURITE_CONTAINER if service == "azure" else GCS_CONTAINER
+        return "stopped" if remove_container(client, name) else "not running"
+
+    return _run_concurrently(_down, services)
+
+
+COMMANDS = {"pull": pull, "up": up, "status": status, "down": down}
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pytest-servers",
+        description="Manage the mock remotes used by the pytest-servers plugin.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, command in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=command.__doc__)
+        subparser.add_argument(
+            "services",
+            nargs="*",
+            metavar="SERVICE",
+            help=f"one of {', '.join(SERVICES)} (default: all)",
+        )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if unknown := set(args.services) - set(SERVICES):
+        parser.error(f"unknown services: {', '.join(sorted(unknown))}")
+    services = args.services or list(SERVICES)
+    return 0 if COMMANDS[args.command](services) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
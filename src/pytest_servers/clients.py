@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from fsspec import AbstractFileSystem
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class ClientCache:
+    """SDK clients and filesystems shared by the paths of a factory.
+
+    Clients are keyed by endpoint and credentials, so that they and their HTTP
+    connection pools are reused for the whole session.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._clients: dict[tuple[str, str], Any] = {}
+
+    def _get(self, key: tuple[str, str], create: Callable[[], _T]) -> _T:
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = create()
+            return self._clients[key]
+
+    def s3(self, client_kwargs: dict[str, Any] | None = None) -> Any:  # noqa: ANN401
+        """Return a botocore S3 client."""
+
+        def create() -> Any:  # noqa: ANN401
+            from botocore.session import Session
+
+            return Session().create_client("s3", **(client_kwargs or {}))
+
+        key = json.dumps(client_kwargs or {}, sort_keys=True, default=str)
+        return self._get(("s3", key), create)
+
+    def azure(self, connection_string: str) -> Any:  # noqa: ANN401
+        """Return an azure `BlobServiceClient`."""
+
+        def create() -> Any:  # noqa: ANN401
+            from azure.storage.blob import BlobServiceClient
+
+            return BlobServiceClient.from_connection_string(conn_str=connection_string)
+
+        return self._get(("azure", connection_string), create)
+
+    def add_filesystem(self, fs: AbstractFileSystem) -> None:
+        """Keep `fs` open until the cache is closed.
+
+        fsspec already returns the same instance for the same storage options,
+        this makes the cache responsible for closing its sessions.
+        """
+        self._get(("fs", str(id(fs))), lambda: fs)
+
+    def close(self) -> None:
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            try:
+                _close(client)
+            except Exception:  # noqa: BLE001, PERF203
+                logger.debug("failed to close %r", client, exc_info=True)
+
+
+def _close(client: Any) -> None:  # noqa: ANN401
+    from fsspec import AbstractFileSystem
+
+    if not isinstance(client, AbstractFileSystem):
+        # botocore clients and azure service clients
+        client.close()
+        return
+
+    # fsspec closes the sessions of async filesystems when they are garbage
+    # collected, which only happens at exit since they are cached
+    if getattr(client, "_s3", None) is not None:  # s3fs
+        client.close_session(client.loop, client._s3)  # noqa: SLF001
+        client._s3 = None  # noqa: SLF001
+    elif getattr(client, "_session", None) is not None:  # gcsfs
+        client.close_session(client.loop, client._session)  # noqa: SLF001
+        client._session = None  # noqa: SLF001
+    elif getattr(client, "service_client", None) is not None:  # adlfs
+        from adlfs.spec import close_service_client
+        from fsspec.asyn import sync
+
+        sync(client.loop, close_service_client, client)
+    # evict the instance only, the cached instances of the class may be used
+    # by the tests or other factories
+    type(client)._cache.pop(client._fs_token, None)  # noqa: SLF001
+
+
+async def aclose_filesystem(fs: Any) -> None:  # noqa: ANN401
+    """Close the sessions of a filesystem created with `asynchronous=True`."""
+    if getattr(fs, "_s3", None) is not None:  # s3fs
+        await fs._s3.__aexit__(None, None, None)  # noqa: SLF001
+        fs._s3 = None  # noqa: SLF001
+    elif getattr(fs, "_session", None) is not None:  # gcsfs
+        await fs._session.close()  # noqa: SLF001
+        fs._session = None  # noqa: SLF001
+    elif getattr(fs, "service_client", None) is not None:  # adlfs
+        from adlfs.spec import close_service_client
+
+        await close_service_client(fs)
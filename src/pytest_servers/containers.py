@@ -0,0 +1,559 @@
+"""Docker containers of the mock remotes, optionally kept warm across sessions.
+
+Containers are labelled with a fingerprint of their image, command, ports
+and options: a matching container is reused, a stale one is replaced.
+Containers with a custom configuration (see `azurite_config`) are named
+after their fingerprint, so that they do not replace the default ones.
+
+The first xdist worker to start a container publishes its endpoint in a
+registry file next to the lock, the other workers only probe that endpoint
+instead of querying docker. A failed startup is published there too, so that
+the workers waiting for the lock do not try again.
+
+In persistent mode, containers restart with the docker daemon and their
+endpoint is cached in a state file, so that later sessions can reuse them
+without waiting for them to start. A detached reaper process removes them
+once they have been idle for a while.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shlex
+import subprocess  # nosec B404
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from .exceptions import HealthcheckTimeout, RemoteUnavailable
+from .prestart import get_prestarted
+from .readiness import record_ready, wait_for, wait_for_container
+from .timing import timings
+from .utils import get_free_port, write_atomic
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Mapping
+
+    import pytest
+    from docker import DockerClient
+    from docker.models.containers import Container
+
+logger = logging.getLogger(__name__)
+
+LABEL_FINGERPRINT = "pytest-servers.fingerprint"
+LABEL_PERSISTENT = "pytest-servers.persistent"
+
+# remove persistent containers after this many seconds without a session
+IDLE_TIMEOUT = 30 * 60
+
+
+# keys of the configuration fixtures of the docker remotes
+CONFIG_KEYS = ("image", "args", "tmpfs", "volumes", "mem_limit", "cpus")
+
+
+def fingerprint(
+    image: str,
+    command: str,
+    ports: list[int],
+    options: dict[str, Any] | None = None,
+) -> str:
+    """Hash of the configuration of a container."""
+    # containers without options keep the fingerprint they always had
+    data = json.dumps([image, command, sorted(ports), *([options] if options else [])])
+    return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+class ContainerConfig(NamedTuple):
+    """Resolved configuration of the container of a mock remote."""
+
+    name: str
+    image: str
+    args: list[str]
+    # extra arguments of `docker run`: mounts and resource limits
+    options: dict[str, Any]
+    fingerprint: str
+
+    def command(self, command: str) -> str:
+        """Return `command` with the extra flags of the configuration."""
+        return _with_args(command, self.args)
+
+
+def _with_args(command: str, args: list[str]) -> str:
+    return f"{command.rstrip()} {shlex.join(args)}" if args else command
+
+
+def container_config(
+    name: str,
+    image: str,
+    command: str,
+    ports: list[int],
+    config: Mapping[str, Any] | None = None,
+) -> ContainerConfig:
+    """Apply a configuration fixture, e.g. `azurite_config`, to a container.
+
+    `config` may override the `image`, append `args` to the command, mount
+    `tmpfs` and `volumes` and limit the memory (`mem_limit`) and `cpus`, as
+    accepted by docker.
+    """
+    config = dict(config or {})
+    if unknown := config.keys() - set(CONFIG_KEYS):
+        msg = f"unknown container config {sorted(unknown)}, expected {CONFIG_KEYS}"
+        raise ValueError(msg)
+
+    default_fp = fingerprint(image, command, ports)
+    image = config.pop("image", image)
+    args = [str(arg) for arg in config.pop("args", [])]
+    options = {key: value for key, value in config.items() if value is not None}
+    if "cpus" in options:
+        options["nano_cpus"] = int(float(options.pop("cpus")) * 1e9)
+
+    fp = fingerprint(image, _with_args(command, args), ports, options)
+    if fp != default_fp:
+        name = f"{name}-{fp[:8]}"
+    return ContainerConfig(name, image, args, options, fp)
+
+
+def state_dir(*, create: bool = False) -> Path:
+    """Directory of the state of the persistent containers.
+
+    Only created with `create`, reading the state does not need it.
+    """
+    cache = Path(os.environ.get("XDG_CACHE_HOME", ""))
+    if not cache.is_absolute():
+        # relative paths are invalid per the XDG spec
+        cache = Path.home() / ".cache"
+    path = cache / "pytest-servers"
+    if create:
+        path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _state_path(name: str, *, create: bool = False) -> Path:
+    return state_dir(create=create) / f"{name}.json"
+
+
+def read_state(name: str) -> dict[str, Any] | None:
+    try:
+        return json.loads(_state_path(name).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def update_state(name: str) -> Iterator[dict[str, Any]]:
+    """Read-modify-write the state of `name`, emptying the dict removes it."""
+    from filelock import FileLock
+
+    path = _state_path(name, create=True)
+    with FileLock(path.with_suffix(".json.lock")):
+        state = read_state(name) or {}
+        yield state
+        if state:
+            path.write_text(json.dumps(state))
+        else:
+            path.unlink(missing_ok=True)
+
+
+def _acquire(state: dict[str, Any]) -> None:
+    state["last_used"] = time.time()
+    state["sessions"] = [
+        pid for pid in state.get("sessions", []) if _is_running(pid)
+    ] + [os.getpid()]
+
+
+def cached_port(
+    name: str,
+    fp: str,
+    is_healthy: Callable[[str], bool],
+) -> str | None:
+    """Port of the persistent container `name`, if it is healthy and up to date.
+
+    Does not talk to docker at all, only probes the cached endpoint once.
+    """
+    state = read_state(name)
+    if state is None or state.get("fingerprint") != fp:
+        return None
+    try:
+        healthy = is_healthy(state["port"])
+    except Exception:  # noqa: BLE001
+        healthy = False
+    if not healthy:
+        return None
+    with update_state(name) as state:
+        if state.get("fingerprint") != fp:
+            # replaced in the meantime
+            return None
+        _acquire(state)
+    return state["port"]
+
+
+def registered_port(
+    registry: Path,
+    fp: str,
+    is_healthy: Callable[[str], bool],
+) -> str | None:
+    """Port of the container published in `registry`, if it is healthy.
+
+    The registry is shared by the xdist workers of a session, and read
+    without the lock of the container: a worker only probes the endpoint
+    once instead of querying docker.
+
+    Raises :class:`RemoteUnavailable` if the container failed to start.
+    """
+    try:
+        entry = json.loads(registry.read_text())
+    except (OSError, ValueError):
+        return None
+    if entry.get("fingerprint") != fp:
+        return None
+    if "error" in entry:
+        raise RemoteUnavailable(entry["error"])
+    try:
+        healthy = is_healthy(entry["port"])
+    except Exception:  # noqa: BLE001
+        healthy = False
+    return entry["port"] if healthy else None
+
+
+def register_port(registry: Path, fp: str, container: Container, port: str) -> None:
+    """Publish the endpoint of a running container for the other workers."""
+    entry = {"fingerprint": fp, "container_id": container.id, "port": port}
+    write_atomic(registry, json.dumps(entry))
+
+
+def register_failure(registry: Path, fp: str, error: str) -> None:
+    """Publish that the container failed to start, for the waiting workers.
+
+    Only under xdist: otherwise the directory of the registry is shared by
+    the following sessions, which must try again.
+    """
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        write_atomic(registry, json.dumps({"fingerprint": fp, "error": error}))
+
+
+def get_container(
+    docker_client: DockerClient,
+    name: str,
+    fp: str,
+    *,
+    persistent: bool = False,
+) -> Container | None:
+    """Return the container `name` if it matches `fp`, removing a stale one."""
+    from docker.errors import NotFound
+
+    try:
+        container = docker_client.containers.get(name)
+    except NotFound:
+        return None
+
+    labels = container.labels or {}
+    if labels.get(LABEL_FINGERPRINT) == fp and (
+        not persistent or labels.get(LABEL_PERSISTENT) == "true"
+    ):
+        if container.status != "running":
+            container.start()
+            container.reload()
+        return container
+
+    logger.info("replacing stale container %s", name)
+    container.remove(force=True)
+    return None
+
+
+def run_container(  # noqa: PLR0913
+    docker_client: DockerClient,
+    name: str,
+    image: str,
+    command: str,
+    ports: dict[str, int | None],
+    fp: str,
+    *,
+    persistent: bool = False,
+    options: dict[str, Any] | None = None,
+) -> Container:
+    """Start a new labelled container.
+
+    `options` are passed to `docker run`, see :func:`container_config`.
+    """
+    kwargs: dict[str, Any] = (
+        {"restart_policy": {"Name": "unless-stopped"}}
+        if persistent
+        else {"remove": True}
+    )
+    kwargs.update(options or {})
+    return docker_client.containers.run(
+        image,
+        command=command,
+        name=name,
+        labels={
+            LABEL_FINGERPRINT: fp,
+            LABEL_PERSISTENT: "true" if persistent else "false",
+        },
+        stdout=True,
+        stderr=True,
+        detach=True,
+        ports=ports,
+        **kwargs,
+    )
+
+
+def save_container(name: str, fp: str, container: Container, port: str) -> None:
+    """Cache the endpoint of a persistent container."""
+    with update_state(name) as state:
+        if state.get("container_id") != container.id:
+            state.pop("sessions", None)
+        state.update(fingerprint=fp, container_id=container.id, port=port)
+        _acquire(state)
+
+
+def remove_container(docker_client: DockerClient, name: str) -> bool:
+    """Remove the container `name` along with its cached endpoint.
+
+    Returns False if there was no such container.
+    """
+    from docker.errors import NotFound
+
+    with update_state(name) as state:
+        state.clear()
+    try:
+        docker_client.containers.get(name).remove(force=True)
+    except NotFound:
+        return False
+    return True
+
+
+def _is_running(pid: int | None) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def release_container(name: str, idle_timeout: float = IDLE_TIMEOUT) -> None:
+    """Remove the persistent container `name` once it has been idle for a while.
+
+    Starts a detached reaper process, unless one is already waiting.
+    """
+    with update_state(name) as state:
+        if not state:
+            return
+        state["last_used"] = time.time()
+        state["sessions"] = [
+            pid for pid in state.get("sessions", []) if pid != os.getpid()
+        ]
+        if _is_running(state.get("reaper_pid")):
+            return
+        process = subprocess.Popen(  # noqa: S603 # nosec B603
+            [sys.executable, "-m", __name__, name, str(idle_timeout)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        state["reaper_pid"] = process.pid
+
+
+def _start_container(  # noqa: PLR0913
+    docker_client: DockerClient,
+    cfg: ContainerConfig,
+    *,
+    name: str,
+    command: str,
+    port: int,
+    ready_log: str,
+    probe: Callable[[str], bool],
+    persistent: bool,
+    fixed_port: bool,
+) -> tuple[Container, str]:
+    """Start the container of `cfg` and wait until it is healthy."""
+    with timings.measure(f"{name}.container"):
+        container = get_container(
+            docker_client,
+            cfg.name,
+            cfg.fingerprint,
+            persistent=persistent,
+        )
+        if container is None:
+            host_port = get_free_port() if fixed_port else None
+            container = run_container(
+                docker_client,
+                cfg.name,
+                cfg.image,
+                cfg.command(command.format(port=host_port) if fixed_port else command),
+                {f"{port}/tcp": host_port},  # None assigns a random port
+                cfg.fingerprint,
+                persistent=persistent,
+                options=cfg.options,
+            )
+
+    with timings.measure(f"{name}.running"):
+        try:
+            wait_for_container(container, timeout=30, log_pattern=ready_log)
+        except (TimeoutError, RuntimeError):
+            raise HealthcheckTimeout(
+                container.name,
+                container.logs().decode(),
+            ) from None
+    host_port = container.ports.get(f"{port}/tcp")[0]["HostPort"]
+
+    with timings.measure(f"{name}.healthcheck"):
+        try:
+            wait_for(lambda: probe(host_port), timeout=30)
+        except TimeoutError:
+            raise HealthcheckTimeout(
+                container.name,
+                container.logs().decode(),
+            ) from None
+    return container, host_port
+
+
+def start_remote(  # noqa: PLR0913
+    docker_client: DockerClient,
+    cfg: ContainerConfig,
+    lock_dir: Path,
+    probe: Callable[[str], bool],
+    *,
+    name: str,
+    command: str,
+    port: int,
+    ready_log: str,
+    persistent: bool = False,
+    fixed_port: bool = False,
+) -> str:
+    """Start the container of a mock remote, or reuse a running one.
+
+    `name` is the server fixture of the remote, `command` its default command
+    and `port` the port it listens on in the container. The container is ready
+    once it logs `ready_log` and `probe` passes for its host port. With
+    `fixed_port`, the host port is chosen up front and formatted into the
+    command, for servers that need to know the URL they are reached at.
+
+    The endpoint is published in a registry in `lock_dir`, or in the state
+    of the container if `persistent`.
+
+    Returns the host port.
+    """
+    from filelock import FileLock
+
+    # endpoint published by the session, or by a previous one if persistent
+    registry = lock_dir / f"{cfg.name}.json"
+
+    def published_port() -> str | None:
+        if persistent:
+            return cached_port(cfg.name, cfg.fingerprint, probe)
+        return registered_port(registry, cfg.fingerprint, probe)
+
+    start = time.perf_counter()
+    if host_port := published_port():
+        record_ready(name, start)
+        return host_port
+
+    lock = (state_dir(create=True) if persistent else lock_dir) / (
+        f"{cfg.name}.container.lock"
+    )
+    with FileLock(lock):
+        # started by another worker while waiting for the lock
+        if host_port := published_port():
+            record_ready(name, start)
+            return host_port
+
+        try:
+            container, host_port = _start_container(
+                docker_client,
+                cfg,
+                name=name,
+                command=command,
+                port=port,
+                ready_log=ready_log,
+                probe=probe,
+                persistent=persistent,
+                fixed_port=fixed_port,
+            )
+        except Exception as exc:
+            if not persistent:
+                register_failure(registry, cfg.fingerprint, str(exc))
+            raise
+
+        if persistent:
+            save_container(cfg.name, cfg.fingerprint, container, host_port)
+        else:
+            register_port(registry, cfg.fingerprint, container, host_port)
+    record_ready(name, start)
+    return host_port
+
+
+def run_remote(
+    request: pytest.FixtureRequest,
+    cfg: ContainerConfig,
+    start: Callable[..., str],
+    *,
+    name: str,
+    service: Callable[[], str | None] | None = None,
+) -> Iterator[str]:
+    """Yield the endpoint of a mock remote for its server fixture `name`.
+
+    The remote started by ``pytest-servers up`` is used if `service` finds
+    one, then the one started by `--servers-prestart`. Otherwise it is
+    started with `start(persistent=...)`.
+    """
+    if service is not None and (endpoint := service()):
+        yield endpoint
+        return
+
+    persistent = request.config.getoption("servers_persistent")
+    prestarted = get_prestarted(request.config, name)
+    if prestarted is not None:
+        yield prestarted.result()
+    else:
+        yield start(persistent=persistent)
+    if persistent:
+        release_container(cfg.name, request.config.getoption("servers_idle_timeout"))
+
+
+def reap(
+    name: str,
+    idle_timeout: float,
+    docker_client: DockerClient | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> None:
+    """Wait until the container `name` is idle, then remove it."""
+    while True:
+        with update_state(name) as state:
+            if not state:
+                return
+            in_use = any(_is_running(pid) for pid in state.get("sessions", []))
+            if in_use:
+                remaining = max(idle_timeout, 1)
+            else:
+                remaining = state["last_used"] + idle_timeout - time.time()
+            if not in_use and remaining <= 0:
+                container_id = state["container_id"]
+                # removes the state
+                state.clear()
+                break
+        sleep(remaining)
+
+    if docker_client is None:
+        import docker
+
+        docker_client = docker.from_env()
+
+    from docker.errors import NotFound
+
+    try:
+        docker_client.containers.get(container_id).remove(force=True)
+    except NotFound:
+        pass
+    logger.info("removed idle container %s", name)
+
+
+if __name__ == "__main__":
+    reap(sys.argv[1], float(sys.argv[2]))
@@ -1,19 +1,58 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
 import os
+import shutil
 import sys
 import tempfile
-from typing import Any, ClassVar
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from functools import partial
+from inspect import signature
+from typing import TYPE_CHECKING, Any, ClassVar
 
 import pytest
 from upath import UPath
 
+from pytest_servers.clients import ClientCache, aclose_filesystem
 from pytest_servers.exceptions import RemoteUnavailable
 from pytest_servers.local import LocalPath
-from pytest_servers.utils import random_string
+from pytest_servers.pool import BucketPool
+from pytest_servers.populate import populate
+from pytest_servers.proxy import FaultProxy, Faults
+from pytest_servers.recording import RequestLog
+from pytest_servers.seed import (
+    clone_local,
+    clone_memory,
+    clone_remote,
+    materialize_seed,
+    read_seed,
+    seed_digest,
+    upload_seed,
+)
+from pytest_servers.timing import timings
+from pytest_servers.utils import random_string, write_atomic
 
 from .utils import MockRemote
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator, Mapping
+    from concurrent.futures import Future
+    from pathlib import Path
+
+    from fsspec.asyn import AsyncFileSystem
+
+    from pytest_servers.populate import Source
+    from pytest_servers.seed import SeedSource
+
+logger = logging.getLogger(__name__)
+
+# fall back to disk when the tmpfs mount has less free space than this
+SHM_MIN_FREE = 64 * 1024 * 1024
+
 
 class TempUPathFactory:
     """Factory for temporary directories with universal-pathlib and mocked servers."""
@@ -41,11 +80,19 @@ class TempUPathFactory:
         ),
     }
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         s3_client_kwargs: dict[str, str] | None = None,
         azure_connection_string: str | None = None,
         gcs_endpoint_url: str | None = None,
+        *,
+        bucket_pool_size: int = 0,
+        bucket_pool_low_water: int | None = None,
+        isolation: str = "bucket",
+        keep_data: bool = False,
+        local_backing: str = "disk",
+        shm_dir: str | os.PathLike | None = None,
+        memory_store: str = "global",
     ) -> None:
         self._request: pytest.FixtureRequest | None = None
 
@@ -54,6 +101,48 @@ class TempUPathFactory:
         self._gcs_endpoint_url = gcs_endpoint_url
         self._s3_client_kwargs = s3_client_kwargs
 
+        self._bucket_pool_size = bucket_pool_size
+        self._bucket_pool_low_water = bucket_pool_low_water
+        self._bucket_pools: dict[tuple[str, bool], BucketPool] = {}
+
+        self._isolation = isolation
+        self._session_buckets: dict[tuple[str, bool, str], UPath] = {}
+
+        self._keep_data = keep_data
+
+        self._memory_store = memory_store
+
+        self._local_backing = local_backing
+        self._shm_dir = shm_dir or "/dev/shm"  # noqa: S108
+        # directory of the session on the tmpfs mount, created on first use
+        self._shm_root: str | None = None
+        # paths created by the factory, innermost scope last
+        self._scopes: list[list[UPath]] = [[]]
+        self._cleanup_executor: ThreadPoolExecutor | None = None
+
+        # clients and filesystems shared by the remote paths
+        self._clients = ClientCache()
+        # filesystems shared by the paths of amktemp, per event loop
+        self._async_filesystems: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop,
+            dict[tuple[str, str], AsyncFileSystem],
+        ] = weakref.WeakKeyDictionary()
+
+        # fault-injecting proxies, per remote and faults
+        self._proxies: dict[tuple[str, Faults], FaultProxy] = {}
+        # logs recording the requests of the proxies, shared with them
+        self._request_logs: list[RequestLog] = []
+
+        # seed datasets: local copy and digest, per seed source
+        self._seeds: dict[Any, tuple[Path, str]] = {}
+        # contents of the seeds cloned to memory, per digest
+        self._seed_blobs: dict[str, dict[str, bytes]] = {}
+        # uploaded seeds, per filesystem and digest
+        self._seed_roots: dict[tuple[Any, str], UPath] = {}
+
+        # errors of the remotes that failed to start, per fixture
+        self._unavailable_remotes: dict[str, str] = {}
+
     @classmethod
     def from_request(
         cls: type[TempUPathFactory],
@@ -63,12 +152,141 @@ class TempUPathFactory:
         **kwargs,
     ) -> TempUPathFactory:
         """Create a factory according to pytest configuration."""
+        config = request.config
+        kwargs.setdefault("bucket_pool_size", config.getoption("servers_bucket_pool"))
+        kwargs.setdefault(
+            "bucket_pool_low_water",
+            config.getoption("servers_bucket_pool_low_water"),
+        )
+        kwargs.setdefault("isolation", config.getoption("servers_isolation"))
+        kwargs.setdefault("keep_data", config.getoption("servers_keep_data"))
+        kwargs.setdefault("local_backing", config.getoption("servers_local_backing"))
+        kwargs.setdefault("shm_dir", config.getoption("servers_shm_dir"))
+        kwargs.setdefault("memory_store", config.getoption("servers_memory_store"))
         tmp_upath_factory = cls(*args, **kwargs)
         tmp_upath_factory._local_path_factory = tmp_path_factory
         tmp_upath_factory._request = request
 
         return tmp_upath_factory
 
+    def close(self) -> None:
+        """Stop the background work started by the factory.
+
+        Removes every path the factory created, unless `keep_data` is set, and
+        closes the clients shared by the paths.
+        """
+        paths = self._scopes[0]
+        for pool in self._bucket_pools.values():
+            paths.extend(pool.close())
+        self._bucket_pools.clear()
+        # prefixes go before the session buckets they live in
+        paths.extend(self._session_buckets.values())
+        self._session_buckets.clear()
+        self._scopes[0] = []
+        self._remove(paths)
+
+        if self._cleanup_executor is not None:
+            self._cleanup_executor.shutdown(wait=True)
+            self._cleanup_executor = None
+        self._clients.close()
+
+        for proxy in self._proxies.values():
+            proxy.stop()
+        self._proxies.clear()
+
+        if self._shm_root is not None and not self._keep_data:
+            # not covered by pytest's basetemp retention
+            shutil.rmtree(self._shm_root, ignore_errors=True)
+            self._shm_root = None
+
+    @contextmanager
+    def scope(self) -> Iterator[None]:
+        """Remove the paths created within the context when it exits.
+
+        The plugin opens a scope for every test using `tmp_upath_factory`, and
+        for the modules and classes of these tests. Paths created outside of a
+        scope are removed when the factory is closed.
+        """
+        self._scopes.append([])
+        try:
+            yield
+        finally:
+            self._remove(self._scopes.pop())
+
+    def _remove(self, paths: list[UPath]) -> None:
+        if self._keep_data:
+            return
+        for path in paths:
+            if isinstance(path, LocalPath):
+                if self._shm_root is not None and path.is_relative_to(self._shm_root):
+                    # free the memory as soon as possible
+                    shutil.rmtree(path, ignore_errors=True)
+                # others are left to pytest's basetemp retention
+                continue
+            if path.protocol == "memory":
+                # the memory store is not thread-safe
+                if getattr(path.fs, "global_store", True):
+                    _remove_path(path)
+                else:
+                    _clear_memory_store(path.fs)
+                continue
+            if self._cleanup_executor is None:
+                self._cleanup_executor = ThreadPoolExecutor(
+                    max_workers=4,
+                    thread_name_prefix="pytest-servers-cleanup",
+                )
+            future = self._cleanup_executor.submit(_remove_path, path)
+            future.add_done_callback(partial(_log_remove_error, path))
+
+    def _setup_mock_remote(self, fs: str) -> None:
+        remote = self.mock_remotes.get(fs)
+        if remote is None or getattr(self, remote.config_attribute_name):
+            self._mock_remote_setup(fs)
+            return
+
+        # a remote that failed once is not set up again: its fixture is not
+        # cached by pytest, and every attempt could wait for a health check
+        name = remote.fixture_name
+        failure_file = self._failure_file(name)
+        if name not in self._unavailable_remotes and failure_file is not None:
+            # written atomically, by the first worker the remote failed for
+            with suppress(FileNotFoundError):
+                self._unavailable_remotes[name] = failure_file.read_text()
+        if name in self._unavailable_remotes:
+            msg = (
+                f"{fs}: mock remote unavailable, its setup failed earlier "
+                f"in this session:\n{self._unavailable_remotes[name]}"
+            )
+            raise RemoteUnavailable(msg)
+        try:
+            # the docker remotes serialize their startup with a lock of their
+            # own, the workers find a running remote without waiting for it
+            self._mock_remote_setup(fs)
+        except Exception as exc:  # noqa: BLE001
+            assert self._request
+            self._unavailable_remotes[name] = str(exc)
+            if failure_file is not None:
+                write_atomic(failure_file, str(exc))
+            from_exc = exc if self._request.config.option.verbose >= 1 else None
+            msg = f"{fs}: Failed to setup mock remote: {exc}" + (
+                "" if from_exc else "\nRun `pytest -v` for more details"
+            )
+            raise RemoteUnavailable(msg) from from_exc
+
+    def _failure_file(self, fixture: str) -> Path | None:
+        """Return the file recording that the remote of `fixture` failed.
+
+        The file is shared by the xdist workers of the session. Without xdist
+        the directory would be shared by the following sessions too, so the
+        failures are only remembered by the factory.
+        """
+        if self._local_path_factory is None or not os.environ.get(
+            "PYTEST_XDIST_WORKER",
+        ):
+            return None
+        root = self._local_path_factory.getbasetemp().parent
+        return root / f"pytest-servers-{fixture}.failed"
+
     def _mock_remote_setup(self, fs: str) -> None:
         try:
             fixture, config_attr, needs_docker = self.mock_remotes[fs]
@@ -88,15 +306,22 @@ class TempUPathFactory:
 
         assert self._request
         remote_config = self._request.getfixturevalue(fixture)
+        # finalizers run in reverse order: remove the temporary paths while
+        # the remote is still running
+        self._request.node.addfinalizer(self.close)
 
         setattr(self, config_attr, remote_config)
 
-    def mktemp(  # noqa: C901 # complex-structure
+    def mktemp(  # noqa: PLR0913
         self,
         fs: str = "local",
         *,
         mock: bool = True,
         version_aware: bool = False,
+        isolation: str | None = None,
+        seed: SeedSource | None = None,
+        backing: str | None = None,
+        faults: Faults | None = None,
         **kwargs,
     ) -> UPath:
         """Create a new temporary directory managed by the factory.
@@ -113,33 +338,425 @@ class TempUPathFactory:
         :param mock:
             Set to False to use real remotes
 
+        :param isolation:
+            How remote paths are isolated from each other, one of
+            - bucket: create a new bucket for every path
+            - prefix: create one bucket per session and return a unique
+              prefix in it for every path. Like any other prefix, the path
+              only exists once something is written under it. Paths with
+              different storage options get different session buckets.
+            Defaults to the `--servers-isolation` option.
+
+        :param seed:
+            Initial contents of the directory: a local directory, or a
+            callable that populates the local directory it is given. The seed
+            is materialized once per session and cloned into every directory
+            created with it: with reflinks for local paths (plain copies on
+            filesystems without copy-on-write), by sharing the buffers
+            for memory paths, and with server-side copies for remotes, where
+            it is uploaded once to a bucket named after its content hash.
+
+        :param backing:
+            Where local directories are created, one of
+            - disk: in pytest's temporary directory
+            - shm: on a tmpfs mount (`/dev/shm` unless `--servers-shm-dir` is
+              set), falling back to disk when it is missing or full
+            Defaults to the `--servers-local-backing` option.
+
+        :param faults:
+            Faults injected into the requests of the returned path, for
+            mock remotes: the path goes through a proxy (see :meth:`proxy`).
+            The bucket is created, seeded and removed without faults.
+            Within :meth:`record`, remote paths go through a proxy even
+            without faults.
+
+        When the bucket pool is enabled (see `--servers-bucket-pool`), buckets
+        for remote filesystems are handed out from a pool of buckets created
+        ahead of time.
+
+        The directory is removed when the current scope (see :meth:`scope`)
+        exits, unless `keep_data` is set.
+
         :returns:
             :class:`upath.Upath` to the new directory.
         """
+        if mock and fs not in ("local", "memory"):
+            self._setup_mock_remote(fs)
+
+        # remote startup is measured separately
+        phase = f"mktemp.{fs}" + (".versioned" if version_aware else "")
+        with timings.measure(phase):
+            path = self._mktemp(
+                fs,
+                mock=mock,
+                version_aware=version_aware,
+                isolation=isolation,
+                backing=backing,
+                **kwargs,
+            )
+        self._scopes[-1].append(path)
+        if seed is not None:
+            with timings.measure(f"seed.{fs}"):
+                self._clone_seed(seed, path)
+        if faults is None and self._request_logs and mock and fs in self.mock_remotes:
+            faults = Faults()
+        if faults is not None:
+            path = self._proxied_path(fs, path, faults)
+        return path
+
+    @contextmanager
+    def record(self) -> Iterator[RequestLog]:
+        """Record the requests made through the proxies within the context.
+
+        The mock remote paths created within the context go through a proxy
+        (without faults, unless requested), so that their requests are
+        recorded.
+        """
+        log = RequestLog()
+        self._request_logs.append(log)
+        try:
+            yield log
+        finally:
+            self._request_logs.remove(log)
+
+    def proxy(self, fs: str, faults: Faults) -> FaultProxy:
+        """Return a proxy injecting `faults` in front of the mock remote `fs`.
+
+        The proxies are started on first use and shared by the paths with
+        the same faults until the factory is closed. Use
+        :meth:`FaultProxy.proxied` to point a client of your own at it.
+        """
+        if fs == "gs":
+            fs = "gcs"
+        if fs not in ("s3", "azure", "gcs"):
+            msg = f"faults are not supported for {fs=}"
+            raise ValueError(msg)
+        key = (fs, faults)
+        if key not in self._proxies:
+            self._setup_mock_remote(fs)
+            upstream = self._endpoint_url(fs)
+            with timings.measure(f"proxy.{fs}"):
+                proxy = FaultProxy(
+                    upstream,
+                    faults,
+                    remote=fs,
+                    logs=self._request_logs,
+                )
+                proxy.start()
+            self._proxies[key] = proxy
+        return self._proxies[key]
+
+    def _endpoint_url(self, fs: str) -> str:
+        endpoint_url: str | None
+        if fs == "s3":
+            client_kwargs = self._s3_client_kwargs or {}
+            endpoint_url = client_kwargs.get("endpoint_url")
+        elif fs == "azure":
+            options = dict(
+                item.split("=", 1)
+                for item in (self._azure_connection_string or "").split(";")
+                if "=" in item
+            )
+            endpoint_url = options.get("BlobEndpoint")
+        else:
+            endpoint_url = self._gcs_endpoint_url
+        if not endpoint_url:
+            msg = f"{fs}: the proxy needs a mock remote with an HTTP endpoint"
+            raise ValueError(msg)
+        return endpoint_url
+
+    def _proxied_path(self, fs: str, path: UPath, faults: Faults) -> UPath:
+        proxy = self.proxy(fs, faults)
+        proxied = UPath(
+            f"{path.protocol}://{path.path}",
+            **proxy.proxied(path.storage_options),
+        )
+        self._clients.add_filesystem(proxied.fs)
+        return proxied
+
+    async def amktemp(
+        self,
+        fs: str = "local",
+        *,
+        mock: bool = True,
+        version_aware: bool = False,
+        **kwargs,
+    ) -> UPath:
+        """Create a new temporary directory from an async test.
+
+        Like :meth:`mktemp`, but the buckets are created with the async
+        filesystems, and the remote paths use filesystems created with
+        `asynchronous=True` for the running event loop. The paths of a loop
+        share their filesystem, and thus its session, until :meth:`aclose`.
+        Remote paths always get a new bucket, and do not support the
+        `isolation`, `seed`, `backing` and `faults` arguments of
+        :meth:`mktemp`. Local and memory paths are the same as with
+        :meth:`mktemp`.
+
+        A mock remote that is not running yet is started like with
+        :meth:`mktemp`, which blocks the event loop. Request its server
+        fixture (as the `async_tmp_*_path` fixtures do) to start it before
+        the test, or start it with `--servers-prestart`: the event loop keeps
+        running while waiting for a prestarted remote.
+        """
+        if fs in ("local", "memory"):
+            return self.mktemp(fs, mock=mock, version_aware=version_aware, **kwargs)
+        if unsupported := sorted(_MKTEMP_ONLY & kwargs.keys()):
+            msg = f"amktemp() does not support {', '.join(unsupported)} for {fs=}"
+            raise TypeError(msg)
+        if mock:
+            await self._wait_prestarted(fs)
+            # pytest's fixtures are only set up from the main thread
+            self._setup_mock_remote(fs)
+
+        phase = f"amktemp.{fs}" + (".versioned" if version_aware else "")
+        with timings.measure(phase):
+            path, sync_path = await self._amktemp(
+                fs,
+                mock=mock,
+                version_aware=version_aware,
+                **kwargs,
+            )
+        # removed like any other path, without the event loop
+        self._clients.add_filesystem(sync_path.fs)
+        self._scopes[-1].append(sync_path)
+        return path
+
+    async def _wait_prestarted(self, fs: str) -> None:
+        remote = self.mock_remotes.get(fs)
+        if (
+            remote is None
+            or self._request is None
+            or getattr(self, remote.config_attribute_name)
+        ):
+            return
+        from pytest_servers.prestart import peek_prestarted
+
+        future = peek_prestarted(self._request.config, remote.fixture_name)
+        if future is not None:
+            # its errors are raised by the fixture
+            await asyncio.wait([asyncio.wrap_future(future)])
+
+    async def _amktemp(
+        self,
+        fs: str,
+        *,
+        mock: bool,
+        version_aware: bool,
+        **kwargs,
+    ) -> tuple[UPath, UPath]:
+        options: dict[str, Any]
+        if fs == "s3":
+            protocol = "s3"
+            client_kwargs = self._s3_client_kwargs
+            options = {
+                "endpoint_url": client_kwargs.get("endpoint_url")
+                if client_kwargs
+                else None,
+                "client_kwargs": client_kwargs,
+                "version_aware": version_aware,
+            }
+        elif fs == "azure":
+            if version_aware and mock:
+                msg = f"not implemented for {fs=}"
+                raise NotImplementedError(msg)
+            if not self._azure_connection_string:
+                msg = "missing connection string"
+                raise RemoteUnavailable(msg)
+            protocol = "az"
+            options = {"connection_string": self._azure_connection_string}
+        elif fs in ("gcs", "gs"):
+            protocol = fs
+            options = {"version_aware": version_aware}
+            if self._gcs_endpoint_url:
+                options["endpoint_url"] = self._gcs_endpoint_url
+        else:
+            raise ValueError(fs)
+        options.update(kwargs)
+
+        afs = self._async_filesystem(protocol, options)
+        bucket_name = f"pytest-servers-{random_string()}"
+        if fs == "s3" and version_aware:
+            await afs._call_s3(  # type: ignore[attr-defined] # noqa: SLF001
+                "create_bucket",
+                Bucket=bucket_name,
+                ACL="public-read",
+                CreateBucketConfiguration={
+                    "LocationConstraint": client_kwargs.get("region_name"),
+                }
+                if client_kwargs
+                else None,
+            )
+            await afs._call_s3(  # type: ignore[attr-defined] # noqa: SLF001
+                "put_bucket_versioning",
+                Bucket=bucket_name,
+                VersioningConfiguration={"Status": "Enabled"},
+            )
+        elif fs in ("gcs", "gs"):
+            await afs._mkdir(  # noqa: SLF001
+                bucket_name,
+                enable_versioning=version_aware,
+                exist_ok=False,
+            )
+        else:
+            await afs._mkdir(bucket_name)  # noqa: SLF001
+
+        url = f"{protocol}://{bucket_name}"
+        path = UPath(url, asynchronous=True, **options)
+        path._fs_cached = afs  # noqa: SLF001
+        return path, UPath(url, **options)
+
+    def _async_filesystem(
+        self,
+        protocol: str,
+        options: dict[str, Any],
+    ) -> AsyncFileSystem:
+        from fsspec import get_filesystem_class
+
+        loop = asyncio.get_running_loop()
+        filesystems = self._async_filesystems.setdefault(loop, {})
+        key = (protocol, json.dumps(options, sort_keys=True, default=str))
+        if key not in filesystems:
+            # fsspec's instance cache does not tell event loops apart
+            filesystems[key] = get_filesystem_class(protocol)(
+                asynchronous=True,
+                skip_instance_cache=True,
+                **options,
+            )
+        return filesystems[key]
+
+    async def aclose(self) -> None:
+        """Close the filesystems of the paths created by :meth:`amktemp`.
+
+        Only closes the filesystems of the running event loop, call it
+        before the loop is closed.
+        """
+        loop = asyncio.get_running_loop()
+        for afs in self._async_filesystems.pop(loop, {}).values():
+            await aclose_filesystem(afs)
+
+    def populate(
+        self,
+        path: UPath,
+        files: Mapping[str, Source] | Iterable[tuple[str, Source]],
+        **kwargs,
+    ) -> None:
+        """Write `files` under `path` concurrently.
+
+        See :func:`pytest_servers.populate.populate` for the arguments.
+        """
+        with timings.measure("populate"):
+            populate(path, files, **kwargs)
+
+    def populate_s3(self, path: UPath, keys: Iterable[str], *, size: int = 0) -> int:
+        """Create objects of `size` zero bytes under the mock s3 `path`.
+
+        The objects are written straight into the moto backend instead of
+        through HTTP, which creates millions of keys in seconds. `keys` are
+        relative to `path` and consumed lazily. Only works with the moto
+        servers running in the test process, i.e. the server and inprocess
+        backends of `s3_server_config`.
+
+        Returns the number of objects created.
+        """
+        if path.protocol not in ("s3", "s3a"):
+            msg = f"populate_s3 only supports s3 paths, not {path.protocol}"
+            raise ValueError(msg)
+        from pytest_servers.s3_bulk import populate_moto
+
+        bucket, _, prefix = path.path.strip("/").partition("/")
+        prefix = f"{prefix}/" if prefix else ""
+        with timings.measure("populate_s3"):
+            count = populate_moto(
+                bucket,
+                (prefix + key.lstrip("/") for key in keys),
+                b"\0" * size,
+            )
+        path.fs.invalidate_cache(path.path)
+        return count
+
+    def _clone_seed(self, seed: SeedSource, dst: UPath) -> None:
+        seed_dir, digest = self._materialize_seed(seed)
+        if isinstance(dst, LocalPath):
+            clone_local(seed_dir, dst)
+        elif dst.protocol == "memory":
+            if digest not in self._seed_blobs:
+                self._seed_blobs[digest] = read_seed(seed_dir)
+            clone_memory(self._seed_blobs[digest], dst)
+        else:
+            key = (dst.fs, digest)
+            if key not in self._seed_roots:
+                bucket = f"pytest-servers-seed-{digest[:16]}"
+                seed_root = UPath(f"{dst.protocol}://{bucket}", **dst.storage_options)
+                upload_seed(seed_dir, seed_root)
+                self._seed_roots[key] = seed_root
+            clone_remote(self._seed_roots[key], dst)
+
+    def _materialize_seed(self, seed: SeedSource) -> tuple[Path, str]:
+        key = seed if callable(seed) else os.fspath(seed)
+        if key not in self._seeds:
+            seed_dir = self.local()
+            materialize_seed(seed, seed_dir)
+            self._seeds[key] = (seed_dir, seed_digest(seed_dir))
+        return self._seeds[key]
+
+    def _mktemp(
+        self,
+        fs: str,
+        *,
+        mock: bool,
+        version_aware: bool,
+        isolation: str | None,
+        backing: str | None,
+        **kwargs,
+    ) -> UPath:
+        if backing is not None and fs != "local":
+            msg = f"{backing=} is only supported for local paths"
+            raise ValueError(msg)
         if fs == "local":
             if version_aware:
                 msg = f"not implemented for {fs=}"
                 raise NotImplementedError(msg)
-            return self.local()
+            return self.local(backing=backing)
         if fs == "memory":
             if version_aware:
                 msg = f"not implemented for {fs=}"
                 raise NotImplementedError(msg)
             return self.memory(**kwargs)
 
-        if mock:
-            try:
-                self._mock_remote_setup(fs)
-            except Exception as exc:  # noqa: BLE001
-                assert self._request
-                from_exc = exc if self._request.config.option.verbose >= 1 else None
-                msg = f"{fs}: Failed to setup mock remote: {exc}" + (
-                    "" if from_exc else "\nRun `pytest -v` for more details"
-                )
-                raise RemoteUnavailable(msg) from from_exc
+        isolation = isolation or self._isolation
+        if isolation not in ("bucket", "prefix"):
+            msg = f"unknown {isolation=}"
+            raise ValueError(msg)
 
+        create = self._remote_factory(
+            fs,
+            mock=mock,
+            version_aware=version_aware,
+            **kwargs,
+        )
+        if isolation == "prefix":
+            # the bucket of the session is created with the storage options
+            options = json.dumps(kwargs, sort_keys=True, default=str)
+            key = (fs, version_aware, options)
+            if key not in self._session_buckets:
+                self._session_buckets[key] = create()
+            return self._session_buckets[key] / random_string(12)
+        if self._bucket_pool_size and not kwargs:
+            return self._bucket_pool(fs, version_aware, create).get()
+        return create()
+
+    def _remote_factory(
+        self,
+        fs: str,
+        *,
+        mock: bool,
+        version_aware: bool,
+        **kwargs,
+    ) -> Callable[[], UPath]:
         if fs == "s3":
-            return self.s3(
+            return partial(
+                self.s3,
                 client_kwargs=self._s3_client_kwargs,
                 version_aware=version_aware,
                 **kwargs,
@@ -151,31 +768,67 @@ class TempUPathFactory:
             if not self._azure_connection_string:
                 msg = "missing connection string"
                 raise RemoteUnavailable(msg)
-            return self.azure(connection_string=self._azure_connection_string, **kwargs)
-
-        if fs == "gcs":
-            return self.gcs(
-                endpoint_url=self._gcs_endpoint_url,
-                version_aware=version_aware,
+            return partial(
+                self.azure,
+                connection_string=self._azure_connection_string,
                 **kwargs,
             )
-
-        if fs == "gs":
-            return self.gs(
+        if fs in ("gcs", "gs"):
+            return partial(
+                self.gcs if fs == "gcs" else self.gs,
                 endpoint_url=self._gcs_endpoint_url,
                 version_aware=version_aware,
                 **kwargs,
             )
         raise ValueError(fs)
 
-    def local(self) -> LocalPath:
-        """Create a local temporary path."""
-        mktemp = (
-            self._local_path_factory.mktemp
-            if self._local_path_factory is not None
-            else tempfile.mktemp
-        )
-        return LocalPath(mktemp("pytest-servers"))  # type: ignore[operator]
+    def _bucket_pool(
+        self,
+        fs: str,
+        version_aware: bool,  # noqa: FBT001
+        create: Callable[[], UPath],
+    ) -> BucketPool:
+        key = (fs, version_aware)
+        if key not in self._bucket_pools:
+            self._bucket_pools[key] = BucketPool(
+                create,
+                size=self._bucket_pool_size,
+                low_water=self._bucket_pool_low_water,
+                name=f"{fs}-pool",
+            )
+        return self._bucket_pools[key]
+
+    def local(self, backing: str | None = None) -> LocalPath:
+        """Create a local temporary path.
+
+        See :meth:`mktemp` for `backing`.
+        """
+        backing = backing or self._local_backing
+        if backing not in ("disk", "shm"):
+            msg = f"unknown {backing=}"
+            raise ValueError(msg)
+        if backing == "shm" and (path := self._shm_mktemp()) is not None:
+            return path
+
+        if self._local_path_factory is not None:
+            return LocalPath(self._local_path_factory.mktemp("pytest-servers"))
+        return LocalPath(tempfile.mkdtemp(prefix="pytest-servers-"))
+
+    def _shm_mktemp(self) -> LocalPath | None:
+        try:
+            free = shutil.disk_usage(self._shm_dir).free
+        except OSError as exc:
+            logger.info("%s is not available, using disk: %s", self._shm_dir, exc)
+            return None
+        if free < SHM_MIN_FREE:
+            logger.info("%s is full, using disk", self._shm_dir)
+            return None
+        if self._shm_root is None:
+            self._shm_root = tempfile.mkdtemp(
+                prefix="pytest-servers-",
+                dir=self._shm_dir,
+            )
+        return LocalPath(tempfile.mkdtemp(prefix="pytest-servers", dir=self._shm_root))
 
     def s3(
         self,
@@ -196,11 +849,9 @@ class TempUPathFactory:
             version_aware=version_aware,
             **kwargs,
         )
+        self._clients.add_filesystem(path.fs)
         if version_aware:
-            from botocore.session import Session
-
-            session = Session()
-            client = session.create_client("s3", **(client_kwargs or {}))
+            client = self._clients.s3(client_kwargs)
             client.create_bucket(
                 Bucket=bucket_name,
                 ACL="public-read",
@@ -226,23 +877,40 @@ class TempUPathFactory:
         **kwargs,
     ) -> UPath:
         """Create a new container and return an UPath instance."""
-        from azure.storage.blob import BlobServiceClient
-
         container_name = f"pytest-servers-{random_string()}"
-        client = BlobServiceClient.from_connection_string(conn_str=connection_string)
+        client = self._clients.azure(connection_string)
         client.create_container(container_name)
 
-        return UPath(
+        path = UPath(
             f"az://{container_name}",
             connection_string=connection_string,
             **kwargs,
         )
+        self._clients.add_filesystem(path.fs)
+        return path
 
     def memory(
         self,
         **kwargs,
     ) -> UPath:
-        """Create a new temporary in-memory path returns an UPath instance."""
+        """Create a new temporary in-memory path returns an UPath instance.
+
+        With the `isolated` memory store (see `--servers-memory-store`), every
+        path has its own store, shared by the paths derived from it, which is
+        dropped when the path is removed. Paths created from its URL (or
+        unpickled) get a new, empty store.
+        """
+        if self._memory_store not in ("global", "isolated"):
+            msg = f"unknown memory_store={self._memory_store!r}"
+            raise ValueError(msg)
+        if self._memory_store == "isolated":
+            from fsspec.implementations.memory import MemoryFileSystem
+
+            if "global_store" not in signature(MemoryFileSystem.__init__).parameters:
+                msg = "the isolated memory store requires fsspec>=2026.9.0"
+                raise RuntimeError(msg)
+            kwargs.setdefault("global_store", False)
+            kwargs.setdefault("skip_instance_cache", True)
         path = UPath(
             f"memory:/{random_string()}",
             **kwargs,
@@ -303,5 +971,27 @@ class TempUPathFactory:
             **client_kwargs,
             **kwargs,
         )
+        self._clients.add_filesystem(path.fs)
         path.fs.mkdir(bucket_name, enable_versioning=version_aware, exist_ok=False)
         return path
+
+
+def _remove_path(path: UPath) -> None:
+    try:
+        path.fs.rm(path.path, recursive=True)
+    except FileNotFoundError:
+        pass
+
+
+# arguments of mktemp that amktemp does not support for remotes
+_MKTEMP_ONLY = frozenset(("isolation", "seed", "backing", "faults"))
+
+
+def _clear_memory_store(fs: Any) -> None:  # noqa: ANN401
+    fs.store.clear()
+    fs.pseudo_dirs[:] = [""]
+
+
+def _log_remove_error(path: UPath, future: Future) -> None:
+    if exc := future.exception():
+        logger.warning("failed to remove %s: %s", path, exc)
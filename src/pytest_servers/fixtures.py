@@ -1,34 +1,514 @@
+"""The pytest plugin of pytest-servers.
+
+Only the fixtures and hooks are defined here. The remotes and the factory
+are imported by the fixtures that use them, so that loading the plugin does
+not import upath, fsspec or the clients of the remotes.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+from functools import partial
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 import pytest
-from upath import UPath
 
-from .azure import azurite  # noqa: F401
-from .factory import TempUPathFactory
-from .gcs import fake_gcs_server  # noqa: F401
-from .s3 import MockedS3Server, s3_server, s3_server_config  # noqa: F401
-from .utils import docker_client, monkeypatch_session  # noqa: F401
+from .containers import IDLE_TIMEOUT
+from .prestart import Prestart, prestart_remotes
+from .timing import timings
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterator
+
+    from docker import DockerClient
     from pytest import MonkeyPatch  # noqa: PT013
+    from upath import UPath
+
+    from .factory import TempUPathFactory
+    from .proxy import Faults
+    from .recording import RequestLog
+
+logger = logging.getLogger(__name__)
 
 
 def _version_aware(request: pytest.FixtureRequest) -> bool:
     return "versioning" in request.fixturenames
 
 
+def _faults(request: pytest.FixtureRequest) -> Faults | None:
+    marker = request.node.get_closest_marker("servers_faults")
+    if marker is None:
+        return None
+    from .proxy import Faults
+
+    return Faults(*marker.args, **marker.kwargs)
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("pytest-servers")
+    group.addoption(
+        "--servers-bucket-pool",
+        type=int,
+        default=0,
+        metavar="N",
+        help="keep N empty buckets per remote created ahead of time "
+        "(default: 0, disabled)",
+    )
+    group.addoption(
+        "--servers-bucket-pool-low-water",
+        type=int,
+        default=None,
+        metavar="N",
+        help="refill the bucket pools when they drop below N buckets "
+        "(default: half of the pool size)",
+    )
+    group.addoption(
+        "--servers-isolation",
+        choices=("bucket", "prefix"),
+        default="bucket",
+        help="isolate temporary remote paths with a new bucket for each path, "
+        "or with a unique prefix in a bucket shared by the session "
+        "(default: bucket)",
+    )
+    group.addoption(
+        "--servers-keep-data",
+        action="store_true",
+        default=False,
+        help="do not remove the temporary paths created by tmp_upath_factory",
+    )
+    group.addoption(
+        "--servers-local-backing",
+        choices=("disk", "shm"),
+        default="disk",
+        help="create local temporary paths on disk, or on a tmpfs mount "
+        "(default: disk)",
+    )
+    group.addoption(
+        "--servers-shm-dir",
+        default=None,
+        metavar="PATH",
+        help="tmpfs mount used by --servers-local-backing=shm (default: /dev/shm)",
+    )
+    group.addoption(
+        "--servers-memory-store",
+        choices=("global", "isolated"),
+        default="global",
+        help="create memory temporary paths in fsspec's global store, or each "
+        "in a store of its own, that their URL does not resolve to "
+        "(default: global)",
+    )
+    group.addoption(
+        "--servers-persistent",
+        action="store_true",
+        default=False,
+        help="keep the docker containers of the mock remotes running between "
+        "sessions, and reuse them while their configuration is unchanged",
+    )
+    group.addoption(
+        "--servers-idle-timeout",
+        type=float,
+        default=IDLE_TIMEOUT,
+        metavar="SECONDS",
+        help="remove the containers kept by --servers-persistent after SECONDS "
+        f"without a session (default: {IDLE_TIMEOUT})",
+    )
+    group.addoption(
+        "--servers-prestart",
+        default=None,
+        metavar="REMOTES",
+        help="start the given mock remotes concurrently at the beginning of the "
+        "session: a comma-separated list of s3, azure and gcs, or 'auto' to "
+        "start the remotes used by the collected tests",
+    )
+    group.addoption(
+        "--servers-timings",
+        action="store_true",
+        default=False,
+        help="report the time spent starting mock remotes and creating temporary paths",
+    )
+    group.addoption(
+        "--servers-timings-json",
+        default=None,
+        metavar="PATH",
+        help="write the raw durations of --servers-timings to a JSON file",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line(
+        "markers",
+        "servers_faults(latency=0, bandwidth=None, error_rate=0, error_status=503, "
+        "reset_rate=0, seed=None): inject faults into the requests of the "
+        "temporary remote paths of the test, see pytest_servers.proxy.Faults",
+    )
+    config.addinivalue_line(
+        "markers",
+        "storage_budget(total=None, **operations): fail the test if it makes more "
+        "requests to the temporary remote paths than allowed, per operation "
+        "(e.g. ListObjectsV2=1) or HTTP method (e.g. HEAD=2)",
+    )
+    if config.getoption("servers_prestart") != "auto":
+        # validate the option early
+        prestart_remotes(config, [])
+
+
+_WORKER_OUTPUT_KEY = "pytest_servers_timings"
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    config = session.config
+    workeroutput = getattr(config, "workeroutput", None)
+    if workeroutput is not None:
+        # pytest-xdist worker: send the timings to the controller
+        workeroutput[_WORKER_OUTPUT_KEY] = timings.to_dict()
+        return
+
+    path = config.getoption("servers_timings_json")
+    if path:
+        Path(path).write_text(json.dumps(timings.to_dict(), indent=2))
+
+
+# request logs of the running tests, by node id
+_request_logs: dict[str, RequestLog] = {}
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_runtest_call(item: pytest.Item) -> None:
+    """Check the `storage_budget` of a test once it has passed."""
+    marker = item.get_closest_marker("storage_budget")
+    log = _request_logs.get(item.nodeid)
+    if marker is None or log is None:
+        return
+    budget = {key: limit for key, limit in marker.kwargs.items() if limit is not None}
+    if errors := log.check_budget(budget):
+        operations = ", ".join(
+            f"{operation}={count}" for operation, count in log.operations().items()
+        )
+        pytest.fail(
+            "storage request budget exceeded:\n  "
+            + "\n  ".join(errors)
+            + f"\nrequests: {operations}",
+            pytrace=False,
+        )
+
+
+# node ids of the modules and classes with tests using tmp_upath_factory
+_factory_scopes: set[str] = set()
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    _factory_scopes.clear()
+    _factory_scopes.update(
+        node.nodeid
+        for item in items
+        if "tmp_upath_factory" in getattr(item, "fixturenames", ())
+        # the test itself is handled by _tmp_upath_scope
+        for node in item.listchain()[:-1]
+    )
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error) -> None:  # noqa: ANN001, ARG001
+    timings.merge(node.workeroutput.get(_WORKER_OUTPUT_KEY, {}))
+
+
+def pytest_terminal_summary(terminalreporter: pytest.TerminalReporter) -> None:
+    if not terminalreporter.config.getoption("servers_timings"):
+        return
+    terminalreporter.write_sep("=", "pytest-servers timings")
+    if not timings:
+        terminalreporter.write_line("nothing was recorded")
+        return
+    header = f"{'phase':<32} {'count':>6} {'total':>9} {'p50':>9} {'p95':>9} {'p99':>9}"
+    terminalreporter.write_line(header)
+    for row in timings.summary():
+        terminalreporter.write_line(
+            f"{row.phase:<32} {row.calls:>6} {row.total:>8.3f}s {row.p50:>8.3f}s "
+            f"{row.p95:>8.3f}s {row.p99:>8.3f}s",
+        )
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _servers_prestart(request: pytest.FixtureRequest) -> None:  # type: ignore[misc]
+    """Start the remotes selected with `--servers-prestart` concurrently."""
+    remotes = prestart_remotes(request.config, request.session.items)
+    if not remotes:
+        yield
+        return
+
+    prestart = Prestart()
+    request.config.pluginmanager.register(prestart, Prestart.name)
+    try:
+        if "s3" in remotes:
+            from .s3 import s3_service, start_s3_server
+
+            config = request.getfixturevalue("s3_server_config")
+            # shared servers are already started once per session
+            if not (
+                (config.get("shared") and os.environ.get("PYTEST_XDIST_WORKER"))
+                or (not config and s3_service())
+            ):
+                prestart.submit(
+                    "s3_server",
+                    start_s3_server,
+                    {k: v for k, v in config.items() if k != "shared"},
+                    cleanup=lambda result: result[1].stop(),
+                )
+        if remotes & {"azure", "gcs"} and not (
+            os.environ.get("CI") and sys.platform == "win32"
+        ):
+            _prestart_docker_remotes(request, prestart, remotes)
+        yield
+    finally:
+        request.config.pluginmanager.unregister(prestart)
+        prestart.close()
+
+
+def _prestart_docker_remotes(
+    request: pytest.FixtureRequest,
+    prestart: Prestart,
+    remotes: set[str],
+) -> None:
+    try:
+        client = request.getfixturevalue("docker_client")
+    except Exception as exc:  # noqa: BLE001
+        # the server fixtures will report it
+        logger.debug("not prestarting docker remotes: %s", exc)
+        return
+    # finalizers run in reverse order: let the startup finish before the docker
+    # client is closed
+    request.node.addfinalizer(prestart.close)
+    lock_dir = request.getfixturevalue("tmp_path_factory").getbasetemp().parent
+    persistent = request.config.getoption("servers_persistent")
+    if "azure" in remotes:
+        from .azure import azurite_service, start_azurite
+
+        config = request.getfixturevalue("azurite_config")
+        if config or not azurite_service():
+            prestart.submit(
+                "azurite",
+                partial(start_azurite, persistent=persistent, config=config),
+                client,
+                lock_dir,
+            )
+    if "gcs" in remotes:
+        from .gcs import fake_gcs_server_service, start_fake_gcs_server
+
+        config = request.getfixturevalue("fake_gcs_server_config")
+        if config or not fake_gcs_server_service():
+            prestart.submit(
+                "fake_gcs_server",
+                partial(start_fake_gcs_server, persistent=persistent, config=config),
+                client,
+                lock_dir,
+            )
+
+
+@pytest.fixture(scope="session")
+def monkeypatch_session() -> pytest.MonkeyPatch:  # type: ignore[misc]
+    """Session-scoped monkeypatch."""
+    m = pytest.MonkeyPatch()
+    yield m
+    m.undo()
+
+
+@pytest.fixture(scope="session")
+def docker_client() -> DockerClient:  # type: ignore[misc]
+    """Run docker commands using the python API."""
+    import docker
+
+    client = docker.from_env()
+
+    yield client
+
+    client.close()
+
+
+@pytest.fixture(scope="session")
+def s3_server_config() -> dict:
+    """Override to change default config of the moto server.
+
+    Set `"shared": True` to start a single moto server in a child process
+    that is shared by all pytest-xdist workers.
+
+    Set `"backend": "process"` to run the server in a child process, out of
+    the tests' GIL, for load tests.
+
+    Set `"backend": "inprocess"` to use moto's in-process interception
+    instead of a server, the client kwargs then have no `endpoint_url`.
+    """
+    return {}
+
+
+@pytest.fixture(scope="session")
+def s3_server(  # type: ignore[misc]
+    monkeypatch_session: pytest.MonkeyPatch,
+    s3_server_config: dict,
+    tmp_path_factory: pytest.TempPathFactory,
+    request: pytest.FixtureRequest,
+) -> dict[str, str | None]:
+    """Spins up a moto s3 server.
+
+    Returns a client_kwargs dict that can be used with a boto client.
+    """
+    from .s3 import run_s3_server
+
+    yield from run_s3_server(
+        monkeypatch_session,
+        s3_server_config,
+        tmp_path_factory,
+        request,
+    )
+
+
+@pytest.fixture(scope="session")
+def azurite_config() -> dict:
+    """Override to change the azurite container.
+
+    Set `"args"` to add flags to the azurite command, e.g.
+    `["--inMemoryPersistence"]` to keep the blobs off the disk. `"image"`,
+    the mounts (`"tmpfs"`, `"volumes"`) and the resource limits
+    (`"mem_limit"`, `"cpus"`) are passed to docker.
+    """
+    return {}
+
+
+@pytest.fixture(scope="session")
+def azurite(  # type: ignore[misc]
+    docker_client: DockerClient,
+    tmp_path_factory: pytest.TempPathFactory,
+    request: pytest.FixtureRequest,
+    azurite_config: dict,
+) -> str:
+    """Spins up an azurite container. Returns the connection string."""
+    from .azure import run_azurite
+
+    yield from run_azurite(docker_client, tmp_path_factory, request, azurite_config)
+
+
+@pytest.fixture(scope="session")
+def fake_gcs_server_config() -> dict:
+    """Override to change the fake-gcs-server container.
+
+    Set `"args"` to add flags to the fake-gcs-server command, e.g.
+    `["-backend", "filesystem"]` along with a `"tmpfs"` mount of
+    `/storage` to keep large objects out of its memory. `"image"`, the
+    mounts (`"tmpfs"`, `"volumes"`) and the resource limits (`"mem_limit"`,
+    `"cpus"`) are passed to docker.
+    """
+    return {}
+
+
+@pytest.fixture(scope="session")
+def fake_gcs_server(  # type: ignore[misc]
+    docker_client: DockerClient,
+    tmp_path_factory: pytest.TempPathFactory,
+    request: pytest.FixtureRequest,
+    fake_gcs_server_config: dict,
+) -> str:
+    """Spins up a fake-gcs-server container. Returns the endpoint URL."""
+    from .gcs import run_fake_gcs_server
+
+    yield from run_fake_gcs_server(
+        docker_client,
+        tmp_path_factory,
+        request,
+        fake_gcs_server_config,
+    )
+
+
 @pytest.fixture
 def versioning():  # noqa: ANN201
     """Enable versioning for supported remotes."""
 
 
 @pytest.fixture(scope="session")
-def tmp_upath_factory(
+def tmp_upath_factory(  # type: ignore[misc]
     request: pytest.FixtureRequest,
     tmp_path_factory: pytest.TempPathFactory,
 ) -> TempUPathFactory:
     """Return a TempUPathFactory instance for the test session."""
-    return TempUPathFactory.from_request(request, tmp_path_factory)
+    from .factory import TempUPathFactory
+
+    factory = TempUPathFactory.from_request(request, tmp_path_factory)
+    yield factory
+    factory.close()
+
+
+def _node_scope(request: pytest.FixtureRequest) -> Iterator[None]:
+    if request.node.nodeid not in _factory_scopes:
+        yield
+        return
+    factory: TempUPathFactory = request.getfixturevalue("tmp_upath_factory")
+    with factory.scope():
+        yield
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _tmp_upath_module_scope(request: pytest.FixtureRequest) -> None:  # type: ignore[misc]
+    """Remove the paths created by module-scoped fixtures with the module."""
+    yield from _node_scope(request)
+
+
+@pytest.fixture(scope="class", autouse=True)
+def _tmp_upath_class_scope(request: pytest.FixtureRequest) -> None:  # type: ignore[misc]
+    """Remove the paths created by class-scoped fixtures with the class."""
+    yield from _node_scope(request)
+
+
+@pytest.fixture(autouse=True)
+def _tmp_upath_scope(request: pytest.FixtureRequest) -> None:  # type: ignore[misc]
+    """Remove the paths created during a test when it finishes."""
+    if "tmp_upath_factory" not in request.fixturenames:
+        if request.node.get_closest_marker("storage_budget"):
+            # only the requests to the temporary paths are recorded
+            pytest.fail(
+                "storage_budget requires a temporary path fixture or "
+                "tmp_upath_factory, the test would not make any recorded request",
+                pytrace=False,
+            )
+        yield
+        return
+    factory: TempUPathFactory = request.getfixturevalue("tmp_upath_factory")
+    with factory.scope():
+        if (
+            "storage_requests" in request.fixturenames
+            or request.node.get_closest_marker(
+                "storage_budget",
+            )
+        ):
+            # before the paths of the test are created
+            request.getfixturevalue("storage_requests")
+        yield
+
+
+@pytest.fixture
+def storage_requests(  # type: ignore[misc]
+    tmp_upath_factory: TempUPathFactory,
+    request: pytest.FixtureRequest,
+) -> RequestLog:
+    """Record the requests made to the temporary remote paths of the test.
+
+    Usage:
+    >>> def test_something(tmp_s3_path, storage_requests):
+    >>>     ...
+    >>>     assert storage_requests.count("ListObjectsV2") <= 1
+
+    The paths go through a local proxy (see `servers_faults`), which does not
+    work with the in-process S3 backend. Budgets can also be declared with
+    the `storage_budget` marker.
+    """
+    with tmp_upath_factory.record() as log:
+        _request_logs[request.node.nodeid] = log
+        try:
+            yield log
+        finally:
+            del _request_logs[request.node.nodeid]
 
 
 @pytest.fixture
@@ -37,13 +517,17 @@ def tmp_s3_path(
     request: pytest.FixtureRequest,
 ) -> UPath:
     """Temporary path on a mocked S3 remote."""
-    return tmp_upath_factory.mktemp("s3", version_aware=_version_aware(request))
+    return tmp_upath_factory.mktemp(
+        "s3",
+        version_aware=_version_aware(request),
+        faults=_faults(request),
+    )
 
 
 @pytest.fixture
 def tmp_local_path(
     tmp_upath_factory: TempUPathFactory,
-    monkeypatch: "MonkeyPatch",
+    monkeypatch: MonkeyPatch,
 ) -> UPath:
     """Return a temporary path."""
     ret = tmp_upath_factory.mktemp()
@@ -52,9 +536,12 @@ def tmp_local_path(
 
 
 @pytest.fixture
-def tmp_azure_path(tmp_upath_factory: TempUPathFactory) -> UPath:
+def tmp_azure_path(
+    tmp_upath_factory: TempUPathFactory,
+    request: pytest.FixtureRequest,
+) -> UPath:
     """Return a temporary path."""
-    return tmp_upath_factory.mktemp("azure")
+    return tmp_upath_factory.mktemp("azure", faults=_faults(request))
 
 
 @pytest.fixture
@@ -72,6 +559,7 @@ def tmp_gcs_path(
     return tmp_upath_factory.mktemp(
         "gcs",
         version_aware=_version_aware(request),
+        faults=_faults(request),
     )
 
 
@@ -96,13 +584,68 @@ def tmp_upath(
         return tmp_upath_factory.mktemp()
     if param == "memory":
         return tmp_upath_factory.mktemp("memory")
+    faults = _faults(request)
     if param == "s3":
-        return tmp_upath_factory.mktemp("s3", version_aware=version_aware)
+        return tmp_upath_factory.mktemp(
+            "s3",
+            version_aware=version_aware,
+            faults=faults,
+        )
     if param == "azure":
-        return tmp_upath_factory.mktemp("azure")
+        return tmp_upath_factory.mktemp("azure", faults=faults)
     if param == "gcs":
-        return tmp_upath_factory.mktemp("gcs", version_aware=version_aware)
+        return tmp_upath_factory.mktemp(
+            "gcs",
+            version_aware=version_aware,
+            faults=faults,
+        )
     if param == "gs":
-        return tmp_upath_factory.mktemp("gs", version_aware=version_aware)
+        return tmp_upath_factory.mktemp(
+            "gs",
+            version_aware=version_aware,
+            faults=faults,
+        )
     msg = f"unknown {param=}"
     raise ValueError(msg)
+
+
+try:
+    import pytest_asyncio
+except ImportError:  # pragma: no cover
+    pass
+else:
+
+    @pytest_asyncio.fixture
+    async def async_tmp_s3_path(
+        tmp_upath_factory: TempUPathFactory,
+        s3_server: dict,  # noqa: ARG001  # started before the event loop
+        request: pytest.FixtureRequest,
+    ) -> AsyncIterator[UPath]:
+        """Temporary path on a mocked S3 remote, with an async filesystem."""
+        yield await tmp_upath_factory.amktemp(
+            "s3",
+            version_aware=_version_aware(request),
+        )
+        await tmp_upath_factory.aclose()
+
+    @pytest_asyncio.fixture
+    async def async_tmp_azure_path(
+        tmp_upath_factory: TempUPathFactory,
+        azurite: str,  # noqa: ARG001
+    ) -> AsyncIterator[UPath]:
+        """Temporary path on azurite, with an async filesystem."""
+        yield await tmp_upath_factory.amktemp("azure")
+        await tmp_upath_factory.aclose()
+
+    @pytest_asyncio.fixture
+    async def async_tmp_gcs_path(
+        tmp_upath_factory: TempUPathFactory,
+        fake_gcs_server: str,  # noqa: ARG001
+        request: pytest.FixtureRequest,
+    ) -> AsyncIterator[UPath]:
+        """Temporary path on fake-gcs-server, with an async filesystem."""
+        yield await tmp_upath_factory.amktemp(
+            "gcs",
+            version_aware=_version_aware(request),
+        )
+        await tmp_upath_factory.aclose()
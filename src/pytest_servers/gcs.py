@@ -1,76 +1,112 @@
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING
+from functools import partial
+from typing import TYPE_CHECKING, Any
 
-import pytest
 import requests
-from filelock import FileLock
 
-from .exceptions import HealthcheckTimeout
-from .utils import get_free_port, wait_until, wait_until_running
+from .containers import container_config, run_remote, start_remote
+from .services import get_service
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping
+    from pathlib import Path
+
+    import pytest
     from docker import DockerClient
-    from docker.models import Container
+
+    from .containers import ContainerConfig
 
 
 logger = logging.getLogger(__name__)
 
 GCS_DEFAULT_PORT = 4443
+GCS_READY_LOG = r"server started at"
+GCS_IMAGE = "fsouza/fake-gcs-server:1.54.0"  # renovate
+# Some features, such as signed URLs and resumable uploads, require
+# `fake-gcs-server` to know the actual url it will be accessed with. We can
+# provide that with -public-host and -external-url.
+GCS_COMMAND = (
+    "-backend memory -scheme http "
+    "-public-host localhost:{port} -external-url http://localhost:{port} "
+)
+GCS_CONTAINER = "pytest-servers-fake-gcs-server"
+
+
+def _is_healthy(port: str) -> bool:
+    return requests.get(f"http://localhost:{port}/storage/v1/b", timeout=1).ok
+
+
+def fake_gcs_server_service() -> str | None:
+    """Return the endpoint of the fake-gcs-server started by ``pytest-servers up``."""
+    info = get_service("gcs", lambda info: _is_healthy(info["port"]))
+    return info["endpoint_url"] if info else None
+
+
+def fake_gcs_server_container(
+    config: Mapping[str, Any] | None = None,
+) -> ContainerConfig:
+    """Return the fake-gcs-server container for `fake_gcs_server_config`."""
+    # the host port is not part of the configuration
+    return container_config(
+        GCS_CONTAINER,
+        GCS_IMAGE,
+        GCS_COMMAND,
+        [GCS_DEFAULT_PORT],
+        config,
+    )
 
 
-@pytest.fixture(scope="session")
-def fake_gcs_server(
+def start_fake_gcs_server(
     docker_client: DockerClient,
-    tmp_path_factory: pytest.TempPathFactory,
+    lock_dir: Path,
+    *,
+    persistent: bool = False,
+    config: Mapping[str, Any] | None = None,
 ) -> str:
-    """Spins up a fake-gcs-server container. Returns the endpoint URL."""
-    from docker.errors import NotFound
-
-    container_name = "pytest-servers-fake-gcs-server"
-
-    root_tmp_dir = tmp_path_factory.getbasetemp().parent
-    fake_gcs_server_lock = root_tmp_dir / "fake_gcs_server.lock"
-
-    with FileLock(fake_gcs_server_lock):
-        container: Container
-        try:
-            container = docker_client.containers.get(container_name)
-            port = container.ports.get(f"{GCS_DEFAULT_PORT}/tcp")[0]["HostPort"]
-            url = f"http://localhost:{port}"
-        except NotFound:
-            # Some features, such as signed URLs and resumable uploads, require
-            # `fake-gcs-server` to know the actual url it will be accessed
-            # with. We can provide that with -public-host and -external-url.
-            port = get_free_port()
-            url = f"http://localhost:{port}"
-            command = (
-                "-backend memory -scheme http "
-                f"-public-host localhost:{port} -external-url {url} "
-            )
-            container = docker_client.containers.run(
-                "fsouza/fake-gcs-server:1.54.0",  # renovate
-                name=container_name,
-                command=command,
-                stdout=True,
-                stderr=True,
-                detach=True,
-                remove=True,
-                ports={f"{GCS_DEFAULT_PORT}/tcp": port},
-            )
-
-        wait_until_running(container)
-
-    try:
-        wait_until(
-            lambda: requests.get(f"{url}/storage/v1/b", timeout=10).ok,
-            timeout=30,
-        )
-    except TimeoutError:
-        raise HealthcheckTimeout(
-            container.name,
-            container.logs().decode(),
-        ) from None
-
-    return url
+    """Start a fake-gcs-server container, or reuse a running one.
+
+    With `persistent`, the container is kept running after the session (see
+    :mod:`pytest_servers.containers`). `config` is the `fake_gcs_server_config`.
+
+    Returns the endpoint URL.
+    """
+    port = start_remote(
+        docker_client,
+        fake_gcs_server_container(config),
+        lock_dir,
+        _is_healthy,
+        name="fake_gcs_server",
+        command=GCS_COMMAND,
+        port=GCS_DEFAULT_PORT,
+        ready_log=GCS_READY_LOG,
+        persistent=persistent,
+        fixed_port=True,
+    )
+    return f"http://localhost:{port}"
+
+
+def run_fake_gcs_server(
+    docker_client: DockerClient,
+    tmp_path_factory: pytest.TempPathFactory,
+    request: pytest.FixtureRequest,
+    fake_gcs_server_config: dict,
+) -> Iterator[str]:
+    """Spin up a fake-gcs-server container for the `fake_gcs_server` fixture.
+
+    Yields the endpoint URL.
+    """
+    yield from run_remote(
+        request,
+        fake_gcs_server_container(fake_gcs_server_config),
+        partial(
+            start_fake_gcs_server,
+            docker_client,
+            tmp_path_factory.getbasetemp().parent,
+            config=fake_gcs_server_config,
+        ),
+        name="fake_gcs_server",
+        # `pytest-servers up` starts the default configuration
+        service=None if fake_gcs_server_config else fake_gcs_server_service,
+    )
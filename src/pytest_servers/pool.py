@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from upath import UPath
+
+logger = logging.getLogger(__name__)
+
+
+class BucketPool:
+    """Pool of empty buckets created ahead of time by a background thread.
+
+    The pool is refilled up to `size` buckets every time it drops below
+    `low_water`.
+    """
+
+    def __init__(
+        self,
+        create: Callable[[], UPath],
+        size: int,
+        low_water: int | None = None,
+        name: str = "bucket-pool",
+    ) -> None:
+        assert size > 0
+        self._create = create
+        self.size = size
+        self.low_water = size // 2 if low_water is None else min(low_water, size)
+        self._buckets: deque[UPath] = deque()
+        self._refill = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"pytest-servers-{name}",
+            daemon=True,
+        )
+        self._refill.set()
+        self._thread.start()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def get(self) -> UPath:
+        """Return an empty bucket, creating it if the pool is exhausted."""
+        try:
+            path = self._buckets.popleft()
+        except IndexError:
+            path = None
+        if len(self._buckets) < self.low_water:
+            self._refill.set()
+        return path if path is not None else self._create()
+
+    def close(self) -> list[UPath]:
+        """Stop refilling the pool and return the buckets that were not used."""
+        self._closed = True
+        self._refill.set()
+        self._thread.join()
+        buckets = list(self._buckets)
+        self._buckets.clear()
+        return buckets
+
+    def _run(self) -> None:
+        while True:
+            self._refill.wait()
+            self._refill.clear()
+            while not self._closed and len(self._buckets) < self.size:
+                try:
+                    self._buckets.append(self._create())
+                except Exception:  # noqa: PERF203
+                    logger.exception("failed to pre-create bucket")
+                    break
+            if self._closed:
+                return
@@ -0,0 +1,121 @@
+"""Concurrent population of temporary paths."""
+
+from __future__ import annotations
+
+import io
+import os
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import IO, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from fsspec import AbstractFileSystem
+    from upath import UPath
+
+# bytes, a local file path, a binary file object or an iterable of bytes chunks
+Source = bytes | str | os.PathLike | IO[bytes] | Iterable[bytes]
+
+CHUNK_SIZE = 1000
+
+
+def populate(
+    path: UPath,
+    files: Mapping[str, Source] | Iterable[tuple[str, Source]],
+    *,
+    max_workers: int = 8,
+    chunk_size: int = CHUNK_SIZE,
+) -> None:
+    """Write `files` under `path` concurrently.
+
+    `files` maps keys relative to `path` to their contents, either as a
+    mapping or as an iterable of `(key, source)` pairs. A source is one of
+    - bytes
+    - the path of a local file, which is uploaded without reading it first
+    - a binary file object or an iterable of bytes, which are streamed
+
+    Iterables are consumed `chunk_size` files at a time, so that large
+    datasets can be generated lazily. Async filesystems (s3, gcs, azure)
+    write each chunk with a batch of concurrent requests, other filesystems
+    use a pool of `max_workers` threads, except memory which is not
+    thread-safe.
+    """
+    items = iter(files.items() if hasattr(files, "items") else files)
+    fs = path.fs
+    protocols = (fs.protocol,) if isinstance(fs.protocol, str) else fs.protocol
+    root = path.path.rstrip("/")
+    while chunk := list(islice(items, chunk_size)):
+        targets = [(f"{root}/{key.lstrip('/')}", src) for key, src in chunk]
+        if getattr(fs, "async_impl", False):
+            _write_async(fs, targets, max_workers)
+        elif "memory" in protocols:
+            for target, src in targets:
+                _write(fs, target, src)
+        else:
+            with ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="pytest-servers-populate",
+            ) as executor:
+                for future in [
+                    executor.submit(_write, fs, target, src) for target, src in targets
+                ]:
+                    future.result()
+
+
+def _write_async(
+    fs: AbstractFileSystem,
+    targets: list[tuple[str, Source]],
+    max_workers: int,
+) -> None:
+    from fsspec.asyn import sync
+
+    data: dict[str, bytes] = {}
+    lpaths: list[str] = []
+    rpaths: list[str] = []
+    streams: list[tuple[str, Source]] = []
+    for target, src in targets:
+        if isinstance(src, (bytes, bytearray, memoryview)):
+            data[target] = bytes(src)
+        elif isinstance(src, (str, os.PathLike)):
+            lpaths.append(os.fspath(src))
+            rpaths.append(target)
+        else:
+            streams.append((target, src))
+
+    if data:
+        sync(fs.loop, fs._pipe, data)  # noqa: SLF001
+    if lpaths:
+        sync(fs.loop, fs._put, lpaths, rpaths)  # noqa: SLF001
+    if streams:
+        # streams are written through file objects, which block on the loop
+        with ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="pytest-servers-populate",
+        ) as executor:
+            for future in [
+                executor.submit(_write, fs, target, src) for target, src in streams
+            ]:
+                future.result()
+
+
+def _write(fs: AbstractFileSystem, target: str, src: Source) -> None:
+    if not getattr(fs, "async_impl", False):
+        # local directories must exist, other filesystems have no directories
+        # or create them
+        fs.makedirs(fs._parent(target), exist_ok=True)  # noqa: SLF001
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        fs.pipe_file(target, bytes(src))
+    elif isinstance(src, (str, os.PathLike)):
+        fs.put_file(os.fspath(src), target)
+    else:
+        with fs.open(target, "wb") as f:
+            blocks = (
+                iter(partial(src.read, 1 << 20), b"")
+                if isinstance(src, io.IOBase) or hasattr(src, "read")
+                else src
+            )
+            for block in blocks:
+                f.write(block)
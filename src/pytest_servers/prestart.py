@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# remote name, as used by `--servers-prestart`, to server fixture name
+PRESTART_FIXTURES = {
+    "s3": "s3_server",
+    "azure": "azurite",
+    "gcs": "fake_gcs_server",
+}
+
+# fixtures that reveal which remotes a test uses
+_REMOTE_FIXTURES = {
+    "tmp_s3_path": "s3",
+    "async_tmp_s3_path": "s3",
+    "s3_server": "s3",
+    "tmp_azure_path": "azure",
+    "async_tmp_azure_path": "azure",
+    "azurite": "azure",
+    "tmp_gcs_path": "gcs",
+    "async_tmp_gcs_path": "gcs",
+    "fake_gcs_server": "gcs",
+}
+
+
+class Prestart:
+    """Mock remotes started concurrently at the beginning of the session.
+
+    Registered as a plugin, so that the server fixtures can pick up the
+    remotes with :func:`get_prestarted`.
+    """
+
+    name = "pytest-servers-prestart"
+
+    def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(PRESTART_FIXTURES),
+            thread_name_prefix="pytest-servers-prestart",
+        )
+        self._futures: dict[str, Future] = {}
+        self._cleanups: dict[str, Callable[[Any], None]] = {}
+
+    def submit(
+        self,
+        fixture_name: str,
+        fn: Callable[..., Any],
+        *args: Any,  # noqa: ANN401
+        cleanup: Callable[[Any], None] | None = None,
+    ) -> None:
+        """Start a remote in the background for the given server fixture.
+
+        `cleanup` is called with the result if no fixture claimed it.
+        """
+        logger.debug("prestarting %s", fixture_name)
+        self._futures[fixture_name] = self._executor.submit(fn, *args)
+        if cleanup is not None:
+            self._cleanups[fixture_name] = cleanup
+
+    def get(self, fixture_name: str) -> Future | None:
+        return self._futures.get(fixture_name)
+
+    def pop(self, fixture_name: str) -> Future | None:
+        self._cleanups.pop(fixture_name, None)
+        return self._futures.pop(fixture_name, None)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        for fixture_name, cleanup in self._cleanups.items():
+            future = self._futures[fixture_name]
+            if future.exception() is None:
+                cleanup(future.result())
+        self._futures.clear()
+        self._cleanups.clear()
+
+
+def get_prestarted(config: pytest.Config, fixture_name: str) -> Future | None:
+    """Return the future of a remote started with `--servers-prestart`.
+
+    The caller becomes responsible for the remote.
+    """
+    prestart: Prestart | None = config.pluginmanager.get_plugin(Prestart.name)
+    if prestart is None:
+        return None
+    return prestart.pop(fixture_name)
+
+
+def peek_prestarted(config: pytest.Config, fixture_name: str) -> Future | None:
+    """Return the future of a prestarted remote, leaving it to its fixture."""
+    prestart: Prestart | None = config.pluginmanager.get_plugin(Prestart.name)
+    if prestart is None:
+        return None
+    return prestart.get(fixture_name)
+
+
+def prestart_remotes(config: pytest.Config, items: list[pytest.Item]) -> set[str]:
+    """Parse the `--servers-prestart` option.
+
+    With `auto`, the remotes are derived from the fixtures and `tmp_upath`
+    parameters of the collected tests.
+    """
+    value = config.getoption("servers_prestart")
+    if not value:
+        return set()
+    if value != "auto":
+        remotes = {remote.strip() for remote in value.split(",") if remote.strip()}
+        remotes = {"gcs" if remote == "gs" else remote for remote in remotes}
+        if unknown := remotes - set(PRESTART_FIXTURES):
+            msg = f"--servers-prestart: unknown remotes {sorted(unknown)}"
+            raise pytest.UsageError(msg)
+        return remotes
+
+    remotes = set()
+    for item in items:
+        fixturenames = getattr(item, "fixturenames", ())
+        remotes.update(
+            _REMOTE_FIXTURES[name] for name in fixturenames if name in _REMOTE_FIXTURES
+        )
+        callspec = getattr(item, "callspec", None)
+        if "tmp_upath" in fixturenames and callspec is not None:
+            param = callspec.params.get("tmp_upath")
+            if param == "gs":
+                param = "gcs"
+            if param in PRESTART_FIXTURES:
+                remotes.add(param)
+    return remotes
@@ -0,0 +1,433 @@
+"""HTTP proxy injecting faults in front of the mock remotes.
+
+The mock remotes answer in microseconds on localhost, the proxy makes them
+behave more like the real ones: slow, throttled and unreliable.
+"""
+
+from __future__ import annotations
+
+import http.client
+import io
+import logging
+import random
+import socket
+import struct
+import threading
+import time
+from collections.abc import Mapping
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import IO, TYPE_CHECKING, Any, NamedTuple
+from urllib.parse import urlsplit
+
+from .recording import StorageRequest, classify
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from typing_extensions import Self
+
+    from .recording import RequestLog
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+
+# headers that only apply to a single connection
+HOP_BY_HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "trailers",
+        "transfer-encoding",
+        "upgrade",
+        # the proxy answers `100 Continue` itself
+        "expect",
+    },
+)
+
+ERROR_CODES = {
+    429: "TooManyRequests",
+    500: "InternalError",
+    503: "SlowDown",
+}
+
+
+class Faults(NamedTuple):
+    """Faults injected by a :class:`FaultProxy`.
+
+    :param latency:
+        Delay before every request is forwarded, in seconds: a constant, a
+        ``(low, high)`` range to draw uniformly from, or a callable returning
+        the delay.
+    :param bandwidth:
+        Cap of the transfer rate of every connection, in bytes per second,
+        in both directions.
+    :param error_rate:
+        Fraction of the requests answered with `error_status` instead of
+        being forwarded.
+    :param error_status:
+        Status of the injected errors, usually 503 (S3's SlowDown, azure's
+        ServerBusy) or 429.
+    :param reset_rate:
+        Fraction of the requests whose connection is reset instead of being
+        answered.
+    :param seed:
+        Seed of the random draws, for reproducible faults.
+    """
+
+    latency: float | tuple[float, float] | Callable[[], float] = 0
+    bandwidth: float | None = None
+    error_rate: float = 0
+    error_status: int = 503
+    reset_rate: float = 0
+    seed: int | None = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _ProxyServer
+    # connection to the upstream, kept alive along with the client's
+    _upstream: http.client.HTTPConnection | None = None
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        logger.debug(format, *args)
+
+    def do_request(self) -> None:
+        proxy = self.server.proxy
+        start = time.perf_counter()
+        body = self._read_body()
+
+        action, delay = proxy.draw()
+        if delay:
+            time.sleep(delay)
+        if action == "reset":
+            self._record(start, None, len(body), 0)
+            self._reset()
+            return
+        if action == "error":
+            error = self._error_body(proxy.faults.error_status)
+            self._record(start, proxy.faults.error_status, len(body), len(error))
+            self._send_error(proxy.faults.error_status, error)
+            return
+
+        try:
+            response = self._forward(body)
+        except OSError as exc:
+            logger.debug("upstream %s failed: %s", proxy.upstream, exc)
+            self._record(start, 502, len(body), 0)
+            self.send_error(502)
+            return
+        with response:
+            self._send_response(response, start, len(body))
+
+    def _record(
+        self,
+        start: float,
+        status: int | None,
+        bytes_sent: int,
+        bytes_received: int,
+    ) -> None:
+        proxy = self.server.proxy
+        if not proxy.logs:
+            return
+        request = StorageRequest(
+            remote=proxy.remote,
+            operation=classify(
+                proxy.remote,
+                self.command,
+                self.path,
+                dict(self.headers.items()),
+            ),
+            method=self.command,
+            path=self.path,
+            status=status,
+            bytes_sent=bytes_sent,
+            bytes_received=bytes_received,
+            duration=time.perf_counter() - start,
+        )
+        for log in list(proxy.logs):
+            log.append(request)
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_DELETE = do_PATCH = do_request  # noqa: N815
+    do_OPTIONS = do_request  # noqa: N815
+
+    def _read_body(self) -> bytes:
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            chunks = []
+            while size := int(self.rfile.readline().split(b";")[0], 16):
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            # trailers
+            while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                pass
+            return b"".join(chunks)
+        length = int(self.headers.get("Content-Length") or 0)
+        return self._throttled_read(length)
+
+    def _throttled_read(self, length: int) -> bytes:
+        throttle = self.server.proxy.throttle()
+        blocks = []
+        while length > 0:
+            block = self.rfile.read(min(length, BLOCK_SIZE))
+            if not block:
+                break
+            length -= len(block)
+            blocks.append(block)
+            throttle(len(block))
+        return b"".join(blocks)
+
+    def _forward(self, body: bytes) -> http.client.HTTPResponse:
+        proxy = self.server.proxy
+        headers = [
+            (key, value)
+            for key, value in self.headers.items()
+            if key.lower() not in HOP_BY_HOP_HEADERS and key.lower() != "content-length"
+        ]
+        if body or self.command in ("PUT", "POST", "PATCH"):
+            headers.append(("Content-Length", str(len(body))))
+
+        for attempt in range(2):
+            conn = self._upstream_connection(new=attempt > 0)
+            try:
+                conn.putrequest(
+                    self.command,
+                    self.path,
+                    skip_host=True,
+                    skip_accept_encoding=True,
+                )
+                for key, value in headers:
+                    conn.putheader(key, value)
+                conn.endheaders(body or None)
+                return conn.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionError):
+                # the kept-alive upstream connection was closed, retry once
+                conn.close()
+                if attempt:
+                    raise
+        msg = f"unreachable: {proxy.upstream}"  # pragma: no cover
+        raise AssertionError(msg)  # pragma: no cover
+
+    def _upstream_connection(self, *, new: bool) -> http.client.HTTPConnection:
+        conn = self._upstream
+        if conn is None or new:
+            host, port = self.server.proxy.upstream
+            conn = http.client.HTTPConnection(host, port, timeout=60)
+            self._upstream = conn
+        return conn
+
+    def _send_response(
+        self,
+        response: http.client.HTTPResponse,
+        start: float,
+        bytes_sent: int,
+    ) -> None:
+        proxy = self.server.proxy
+        head = self.command == "HEAD" or response.status in (204, 304)
+        length = response.getheader("Content-Length")
+        body = None
+        if length is None and not head:
+            # only small responses are not sized upfront
+            body = response.read()
+            length = str(len(body))
+        # recorded before the client gets the response
+        self._record(
+            start, response.status, bytes_sent, 0 if head else int(length or 0)
+        )
+
+        self.send_response_only(response.status, response.reason)
+        for key, value in response.getheaders():
+            lower = key.lower()
+            if lower in HOP_BY_HOP_HEADERS or lower == "content-length":
+                continue
+            if lower == "location":
+                value = proxy.proxied(value)
+            self.send_header(key, value)
+        if length is not None:
+            self.send_header("Content-Length", length)
+        self.end_headers()
+
+        if head:
+            response.read()
+        else:
+            self._copy_body(response if body is None else io.BytesIO(body))
+        if response.will_close:
+            self._upstream = None
+
+    def _copy_body(self, src: IO[bytes]) -> None:
+        throttle = self.server.proxy.throttle()
+        while block := src.read(BLOCK_SIZE):
+            self.wfile.write(block)
+            throttle(len(block))
+
+    def finish(self) -> None:
+        super().finish()
+        if self._upstream is not None:
+            self._upstream.close()
+
+    @staticmethod
+    def _error_body(status: int) -> bytes:
+        code = ERROR_CODES.get(status, "ServiceUnavailable")
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f"<Error><Code>{code}</Code>"
+            "<Message>Injected by pytest-servers</Message></Error>"
+        ).encode()
+
+    def _send_error(self, status: int, body: bytes) -> None:
+        self.send_response_only(status)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Retry-After", "0")
+        # azure reads the error code from the headers
+        self.send_header("x-ms-error-code", "ServerBusy")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _reset(self) -> None:
+        # close with a RST instead of a FIN
+        self.connection.setsockopt(
+            socket.SOL_SOCKET,
+            socket.SO_LINGER,
+            struct.pack("ii", 1, 0),
+        )
+        self.connection.close()
+        self.close_connection = True
+
+
+class _ProxyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, proxy: FaultProxy) -> None:
+        self.proxy = proxy
+        super().__init__(("127.0.0.1", 0), _Handler)
+
+    def handle_error(self, request: Any, client_address: Any) -> None:  # noqa: ANN401, ARG002
+        # clients giving up on a slow response are expected
+        logger.debug("proxy error from %s", client_address, exc_info=True)  # noqa: LOG014
+
+
+class FaultProxy:
+    """Reverse proxy of `upstream_url`, injecting `faults`.
+
+    Every path using the proxy's endpoint goes through it, see
+    :meth:`proxied` to rewrite the endpoints of the remotes.
+
+    The requests are recorded to the logs in `logs`, classified into the
+    operations of `remote` (see :mod:`pytest_servers.recording`).
+    """
+
+    def __init__(
+        self,
+        upstream_url: str,
+        faults: Faults | None = None,
+        *,
+        remote: str | None = None,
+        logs: list[RequestLog] | None = None,
+    ) -> None:
+        parts = urlsplit(upstream_url)
+        if parts.scheme != "http" or not parts.hostname:
+            msg = f"can only proxy http endpoints, got {upstream_url!r}"
+            raise ValueError(msg)
+        self.upstream = (parts.hostname, parts.port or 80)
+        self._upstream_netloc = parts.netloc
+        self.faults = faults or Faults()
+        self.remote = remote
+        # shared with the owner of the proxy, which adds and removes logs
+        self.logs = logs if logs is not None else []
+        self._random = random.Random(self.faults.seed)  # noqa: S311 # nosec B311
+        self._lock = threading.Lock()
+        self._server: _ProxyServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        assert self._server
+        return self._server.server_address[1]
+
+    @property
+    def endpoint_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> None:
+        self._server = _ProxyServer(self)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name=f"pytest-servers-proxy-{self.port}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_args: object) -> None:
+        self.stop()
+
+    def proxied(self, value: Any) -> Any:  # noqa: ANN401
+        """Replace the upstream endpoint with the proxy's in `value`.
+
+        Works on URLs and connection strings, and recursively on the values
+        of mappings, such as storage options.
+        """
+        if isinstance(value, Mapping):
+            return {key: self.proxied(item) for key, item in value.items()}
+        if not isinstance(value, str):
+            return value
+        netloc = f"127.0.0.1:{self.port}"
+        for upstream in self._upstream_aliases():
+            value = value.replace(f"//{upstream}", f"//{netloc}")
+        return value
+
+    def _upstream_aliases(self) -> Iterator[str]:
+        yield self._upstream_netloc
+        host, port = self.upstream
+        # fake-gcs-server advertises localhost
+        for alias in ("localhost", "127.0.0.1"):
+            if alias != host:
+                yield f"{alias}:{port}"
+
+    def draw(self) -> tuple[str | None, float]:
+        """Draw the fault and the latency of a request."""
+        faults = self.faults
+        with self._lock:
+            if callable(faults.latency):
+                delay = faults.latency()
+            elif isinstance(faults.latency, tuple):
+                delay = self._random.uniform(*faults.latency)
+            else:
+                delay = faults.latency
+            draw = self._random.random()
+        if draw < faults.reset_rate:
+            return "reset", delay
+        if draw < faults.reset_rate + faults.error_rate:
+            return "error", delay
+        return None, delay
+
+    def throttle(self) -> Callable[[int], None]:
+        """Return a callback that sleeps to keep a transfer under the bandwidth."""
+        bandwidth = self.faults.bandwidth
+        if not bandwidth:
+            return lambda _: None
+        start = time.perf_counter()
+        sent = 0
+
+        def _throttle(nbytes: int) -> None:
+            nonlocal sent
+            sent += nbytes
+            ahead = sent / bandwidth - (time.perf_counter() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+
+        return _throttle
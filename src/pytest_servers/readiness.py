@@ -0,0 +1,146 @@
+"""Readiness checks for the mock remotes.
+
+Instead of polling at a fixed interval, containers are awaited through the
+docker events and log streams, and HTTP probes are retried with a fast
+exponential backoff.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from .timing import timings
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from docker.models.containers import Container
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delays(
+    initial: float = 0.005,
+    maximum: float = 0.5,
+    factor: float = 2,
+) -> Iterator[float]:
+    """Exponentially growing delays, with jitter."""
+    delay = initial
+    while True:
+        yield delay / 2 + random.uniform(0, delay / 2)  # nosec B311 # noqa: S311
+        delay = min(delay * factor, maximum)
+
+
+def wait_for(
+    probe: Callable[[], bool],
+    timeout: float,
+    *,
+    initial: float = 0.005,
+    maximum: float = 0.5,
+) -> None:
+    """Wait until `probe` returns True, backing off exponentially between tries.
+
+    Exceptions raised by `probe` count as failed tries.
+    """
+    deadline = time.perf_counter() + timeout
+    exc = None
+    for delay in backoff_delays(initial, maximum):
+        try:
+            if probe():
+                return
+        except Exception as e:  # noqa: BLE001
+            exc = e
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        time.sleep(min(delay, remaining))
+
+    msg = "timed out waiting"
+    raise TimeoutError(msg) from exc
+
+
+def wait_for_container_start(container: Container, timeout: float) -> None:
+    """Wait for the container start event on the docker events stream."""
+    events = container.client.events(
+        filters={"container": container.id, "event": ["start", "die"]},
+        decode=True,
+    )
+    with _closing_after(events, timeout):
+        # the container could have started before we subscribed
+        container.reload()
+        if container.status == "running":
+            return
+        event = next(_iter_stream(events), None)
+
+    if event is None:
+        msg = f"timed out waiting for container {container.name} to start"
+        raise TimeoutError(msg)
+    if event.get("Action", event.get("status")) == "die":
+        msg = f"container {container.name} exited"
+        raise RuntimeError(msg)
+    container.reload()
+
+
+def wait_for_log_line(container: Container, pattern: str, timeout: float) -> None:
+    """Wait for a line matching `pattern` on the container log stream."""
+    regex = re.compile(pattern.encode())
+    logs = container.logs(stream=True, follow=True)
+    buffer = b""
+    with _closing_after(logs, timeout):
+        for chunk in _iter_stream(logs):
+            buffer = buffer[-4096:] + chunk
+            if regex.search(buffer):
+                return
+
+    msg = f"timed out waiting for {pattern!r} in the logs of {container.name}"
+    raise TimeoutError(msg)
+
+
+def wait_for_container(
+    container: Container,
+    timeout: float,
+    log_pattern: str | None = None,
+) -> None:
+    """Wait until the container is running and has logged `log_pattern`."""
+    deadline = time.perf_counter() + timeout
+    wait_for_container_start(container, timeout)
+    if log_pattern:
+        wait_for_log_line(
+            container,
+            log_pattern,
+            max(deadline - time.perf_counter(), 0),
+        )
+
+
+def record_ready(name: str, start: float) -> None:
+    """Report the time it took for `name` to become ready since `start`."""
+    elapsed = time.perf_counter() - start
+    timings.record(f"{name}.ready", elapsed)
+    logger.info("%s ready in %.3fs", name, elapsed)
+
+
+@contextmanager
+def _closing_after(stream: Iterator, timeout: float) -> Iterator[None]:
+    # docker streams block until the next item, close them from another thread
+    # to enforce the timeout
+    timer = threading.Timer(timeout, stream.close)  # type: ignore[attr-defined]
+    timer.start()
+    try:
+        yield
+    finally:
+        timer.cancel()
+        stream.close()  # type: ignore[attr-defined]
+
+
+def _iter_stream(stream: Iterator) -> Iterator:
+    try:
+        yield from stream
+    except Exception:  # noqa: BLE001
+        # reading from a stream that was closed by the timer
+        return
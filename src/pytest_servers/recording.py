@@ -0,0 +1,279 @@
+"""Record of the requests made to the mock remotes, see :mod:`pytest_servers.proxy`.
+
+Requests are classified into the operations of the remote's API, e.g.
+``ListObjectsV2`` on S3, ``ListBlobs`` on azure or ``objects.list`` on gcs.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from collections import Counter
+from typing import TYPE_CHECKING, NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping
+
+
+class StorageRequest(NamedTuple):
+    """A request made to a mock remote.
+
+    `duration` is the time until the response started, including injected
+    latency; the transfer of the response body is not included.
+    """
+
+    remote: str | None
+    operation: str
+    method: str
+    path: str
+    status: int | None
+    bytes_sent: int
+    bytes_received: int
+    duration: float
+
+
+class RequestLog:
+    """Requests recorded while a test runs.
+
+    >>> storage_requests.count("ListObjectsV2")  # an operation
+    >>> storage_requests.count("HEAD")  # or an HTTP method
+    """
+
+    def __init__(self) -> None:
+        self._requests: list[StorageRequest] = []
+        self._lock = threading.Lock()
+
+    def append(self, request: StorageRequest) -> None:
+        with self._lock:
+            self._requests.append(request)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._requests.clear()
+
+    @property
+    def requests(self) -> list[StorageRequest]:
+        with self._lock:
+            return list(self._requests)
+
+    def __iter__(self) -> Iterator[StorageRequest]:
+        return iter(self.requests)
+
+    def __len__(self) -> int:
+        return len(self.requests)
+
+    def filter(self, operation: str | None = None) -> list[StorageRequest]:
+        """Return the requests of `operation`, an operation or an HTTP method."""
+        return [
+            request
+            for request in self.requests
+            if operation is None or operation in (request.operation, request.method)
+        ]
+
+    def count(self, operation: str | None = None) -> int:
+        """Return the number of requests of `operation`, all of them by default."""
+        return len(self.filter(operation))
+
+    def bytes_sent(self, operation: str | None = None) -> int:
+        return sum(request.bytes_sent for request in self.filter(operation))
+
+    def bytes_received(self, operation: str | None = None) -> int:
+        return sum(request.bytes_received for request in self.filter(operation))
+
+    def operations(self) -> Counter[str]:
+        """Return the number of requests per operation."""
+        return Counter(request.operation for request in self.requests)
+
+    def check_budget(self, budget: Mapping[str, int]) -> list[str]:
+        """Return a message for every entry of `budget` that was exceeded.
+
+        The keys are operations, HTTP methods, or ``total`` for all requests.
+        """
+        errors = []
+        for operation, limit in budget.items():
+            count = self.count(None if operation == "total" else operation)
+            if count > limit:
+                errors.append(f"{operation}: {count} requests > {limit}")
+        return errors
+
+
+def classify(
+    remote: str | None,
+    method: str,
+    url: str,
+    headers: Mapping[str, str],
+) -> str:
+    """Return the API operation of a request to `remote`."""
+    parts = urlsplit(url)
+    query = parse_qs(parts.query, keep_blank_values=True)
+    if remote == "s3":
+        return _classify_s3(method, parts.path, query, headers)
+    if remote == "azure":
+        return _classify_azure(method, parts.path, query, headers)
+    if remote == "gcs":
+        return _classify_gcs(method, parts.path)
+    return method
+
+
+_S3_BUCKET_GET = {
+    "versions": "ListObjectVersions",
+    "location": "GetBucketLocation",
+    "versioning": "GetBucketVersioning",
+    "uploads": "ListMultipartUploads",
+    "policy": "GetBucketPolicy",
+    "acl": "GetBucketAcl",
+    "tagging": "GetBucketTagging",
+}
+_S3_BUCKET_PUT = {
+    "versioning": "PutBucketVersioning",
+    "policy": "PutBucketPolicy",
+    "acl": "PutBucketAcl",
+    "tagging": "PutBucketTagging",
+}
+_S3_OBJECT_GET = {
+    "uploadId": "ListParts",
+    "tagging": "GetObjectTagging",
+    "acl": "GetObjectAcl",
+}
+
+
+def _classify_s3(  # noqa: C901, PLR0911, PLR0912
+    method: str,
+    path: str,
+    query: dict[str, list[str]],
+    headers: Mapping[str, str],
+) -> str:
+    # path-style addressing: /bucket/key
+    bucket, _, key = path.lstrip("/").partition("/")
+    copy = any(name.lower() == "x-amz-copy-source" for name in headers)
+    if not bucket:
+        return "ListBuckets" if method == "GET" else method
+    if not key:
+        if method == "GET":
+            if query.get("list-type") == ["2"]:
+                return "ListObjectsV2"
+            for param, operation in _S3_BUCKET_GET.items():
+                if param in query:
+                    return operation
+            return "ListObjects"
+        if method == "HEAD":
+            return "HeadBucket"
+        if method == "PUT":
+            for param, operation in _S3_BUCKET_PUT.items():
+                if param in query:
+                    return operation
+            return "CreateBucket"
+        if method == "POST" and "delete" in query:
+            return "DeleteObjects"
+        if method == "DELETE":
+            return "DeleteBucket"
+        return method
+    if method == "GET":
+        for param, operation in _S3_OBJECT_GET.items():
+            if param in query:
+                return operation
+        return "GetObject"
+    if method == "HEAD":
+        return "HeadObject"
+    if method == "PUT":
+        if "partNumber" in query:
+            return "UploadPartCopy" if copy else "UploadPart"
+        if "tagging" in query:
+            return "PutObjectTagging"
+        return "CopyObject" if copy else "PutObject"
+    if method == "POST":
+        if "uploads" in query:
+            return "CreateMultipartUpload"
+        if "uploadId" in query:
+            return "CompleteMultipartUpload"
+        return method
+    if method == "DELETE":
+        return "AbortMultipartUpload" if "uploadId" in query else "DeleteObject"
+    return method
+
+
+def _classify_azure(  # noqa: C901, PLR0911, PLR0912
+    method: str,
+    path: str,
+    query: dict[str, list[str]],
+    headers: Mapping[str, str],
+) -> str:
+    # azurite uses path-style addressing: /account/container/blob
+    _, _, rest = path.lstrip("/").partition("/")
+    container, _, blob = rest.partition("/")
+    comp = query.get("comp", [""])[0]
+    if comp == "batch":
+        return "BlobBatch"
+    if not container:
+        if comp == "list":
+            return "ListContainers"
+        return "GetAccountInfo" if "restype" in query else method
+    if not blob:
+        if comp == "list":
+            return "ListBlobs"
+        if method == "PUT":
+            return "CreateContainer"
+        if method == "DELETE":
+            return "DeleteContainer"
+        if method in ("GET", "HEAD"):
+            return "GetContainerProperties"
+        return method
+    if method == "HEAD":
+        return "GetBlobProperties"
+    if method == "GET":
+        return "GetBlockList" if comp == "blocklist" else "GetBlob"
+    if method == "PUT":
+        if comp == "block":
+            return "PutBlock"
+        if comp == "blocklist":
+            return "PutBlockList"
+        if comp:
+            return f"SetBlob{comp.capitalize()}"
+        if any(name.lower() == "x-ms-copy-source" for name in headers):
+            return "CopyBlob"
+        return "PutBlob"
+    if method == "DELETE":
+        return "DeleteBlob"
+    return method
+
+
+_GCS_PATH = re.compile(
+    r"^/(?P<api>storage|upload/storage|download/storage|batch/storage)/v1"
+    r"(?:/b(?:/(?P<bucket>[^/]+)(?P<objects>/o(?:/(?P<object>.+))?)?)?)?",
+)
+
+
+_GCS_METHODS = {"GET": "get", "DELETE": "delete", "PATCH": "patch", "PUT": "update"}
+
+
+def _classify_gcs(method: str, path: str) -> str:  # noqa: C901, PLR0911
+    match = _GCS_PATH.match(path)
+    if match is None:
+        # XML API and signed URLs
+        return {"GET": "objects.get", "PUT": "objects.insert"}.get(method, method)
+    api, bucket, objects, obj = match.group("api", "bucket", "objects", "object")
+    if api == "batch/storage":
+        return "batch"
+    if api == "upload/storage":
+        return "objects.insert"
+    if api == "download/storage":
+        return "objects.get"
+    # object names are quoted, slashes only separate the actions
+    if obj is not None:
+        if "/rewriteTo/" in obj:
+            return "objects.rewrite"
+        if "/copyTo/" in obj:
+            return "objects.copy"
+        if obj.endswith("/compose"):
+            return "objects.compose"
+        if method in _GCS_METHODS:
+            return f"objects.{_GCS_METHODS[method]}"
+        return method
+    if objects is not None:
+        return "objects.list" if method == "GET" else "objects.insert"
+    if bucket is not None:
+        if method in _GCS_METHODS:
+            return f"buckets.{_GCS_METHODS[method]}"
+        return method
+    return {"GET": "buckets.list", "POST": "buckets.insert"}.get(method, method)
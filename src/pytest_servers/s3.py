@@ -1,6 +1,50 @@
 from __future__ import annotations
 
-import pytest
+import atexit
+import hashlib
+import inspect
+import io
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from contextlib import contextmanager, suppress
+from typing import TYPE_CHECKING, Any
+
+import requests
+from filelock import FileLock
+
+from .prestart import get_prestarted
+from .readiness import record_ready, wait_for
+from .services import get_service
+from .utils import get_free_port
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator, Iterator
+    from pathlib import Path
+
+    import pytest
+
+logger = logging.getLogger(__name__)
+
+MOTO_CREDENTIALS = {
+    "aws_access_key_id": "pytest-servers",
+    "aws_secret_access_key": "pytest-servers",
+    "aws_session_token": "pytest-servers",
+    "region_name": "pytest-servers-region",
+}
+
+
+def _client_host(ip_address: str) -> str:
+    # `0.0.0.0`/`::` are wildcard bind addresses: valid for listening, but not a
+    # stable client destination. When users bind moto to all interfaces (common
+    # on Linux CI), advertise localhost so the test process can connect.
+    if ip_address in {"0.0.0.0", "::", "::0"}:  # noqa: S104
+        return "127.0.0.1"
+    return ip_address
 
 
 class MockedS3Server:
@@ -17,13 +61,7 @@ class MockedS3Server:
 
     @property
     def endpoint_url(self) -> str:
-        # `0.0.0.0`/`::` are wildcard bind addresses: valid for listening, but not a
-        # stable client destination. When users bind moto to all interfaces (common
-        # on Linux CI), advertise localhost so the test process can connect.
-        host = self.ip_address
-        if host in {"0.0.0.0", "::", "::0"}:  # noqa: S104
-            host = "127.0.0.1"
-        return f"http://{host}:{self.port}"
+        return f"http://{_client_host(self.ip_address)}:{self.port}"
 
     @property
     def port(self) -> int:
@@ -35,37 +73,436 @@ class MockedS3Server:
     def ip_address(self) -> str:
         return self._server._ip_address  # noqa: SLF001
 
-    def __enter__(self):
+    def start(self) -> None:
+        start = time.perf_counter()
         self._server.start()
+        record_ready("s3_server", start)
+
+    def stop(self) -> None:
+        self._server.stop()
+
+    def __enter__(self):
+        self.start()
         return self
 
     def __exit__(self, *exc_args):
-        self._server.stop()
+        self.stop()
+
+
+class MockedS3ServerProcess:
+    """moto server running in a child process.
+
+    Unlike :class:`MockedS3Server`, the server does not share the GIL with the
+    tests and can outlive the process that started it. With `detach`, it runs
+    in a new session, so it is not interrupted along with its parent.
+    """
+
+    def __init__(
+        self,
+        ip_address: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        verbose: bool = True,
+        detach: bool = False,
+    ):
+        self.ip_address = ip_address
+        self.port = port
+        self._verbose = verbose
+        self._detach = detach
+        self._process: subprocess.Popen | None = None
+
+    @property
+    def endpoint_url(self) -> str:
+        return f"http://{_client_host(self.ip_address)}:{self.port}"
+
+    @property
+    def pid(self) -> int:
+        assert self._process
+        return self._process.pid
+
+    def start(self) -> None:
+        start = time.perf_counter()
+        if not self.port:
+            self.port = get_free_port()
+        output = None if self._verbose else subprocess.DEVNULL
+        self._process = subprocess.Popen(  # noqa: S603
+            [
+                sys.executable,
+                "-m",
+                "moto.server",
+                "-H",
+                self.ip_address,
+                "-p",
+                str(self.port),
+            ],
+            stdin=subprocess.DEVNULL if self._detach else None,
+            stdout=output,
+            stderr=output,
+            start_new_session=self._detach,
+        )
+        try:
+            wait_for(lambda: is_moto_healthy(self.endpoint_url), timeout=30)
+        except TimeoutError:
+            self.stop()
+            raise
+        record_ready("s3_server", start)
+
+    def stop(self) -> None:
+        assert self._process
+        self._process.terminate()
+        self._process.wait()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_args):
+        self.stop()
+
+
+class InProcessS3Backend:
+    """moto's in-process `mock_aws` interception, without an HTTP server.
+
+    boto and s3fs calls to AWS go straight to the moto backend, instead of
+    through the network stack. This mocks every AWS service for the whole
+    process, until the backend is stopped.
+    """
+
+    endpoint_url = None
+
+    def __init__(self) -> None:
+        from moto import mock_aws
+
+        self._mock = mock_aws()
+        self._restore: Callable[[], None] | None = None
+
+    def start(self) -> None:
+        start = time.perf_counter()
+        self._mock.start()
+        self._restore = _patch_moto_stubber()
+        record_ready("s3_server", start)
+
+    def stop(self) -> None:
+        if self._restore is not None:
+            self._restore()
+            self._restore = None
+        self._mock.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_args):
+        self.stop()
+
+
+class _AioStreamReader:
+    def __init__(self, body: bytes) -> None:
+        self._buffer = io.BytesIO(body)
+        self._size = len(body)
+
+    async def read(self, n: int = -1) -> bytes:
+        return self._buffer.read(n)
+
+    def at_eof(self) -> bool:
+        return self._buffer.tell() >= self._size
+
+
+class _AioRawResponse:
+    """Enough of an aiohttp response for aiobotocore to read the body."""
 
+    def __init__(self, url: str, body: bytes) -> None:
+        self.url = url
+        self.content = _AioStreamReader(body)
 
-@pytest.fixture(scope="session")
-def s3_server_config() -> dict:
-    """Override to change default config of the moto server."""
-    return {}
+    async def read(self) -> bytes:
+        return await self.content.read()
 
+    def close(self) -> None:
+        pass
 
-@pytest.fixture(scope="session")
-def s3_server(  # type: ignore[misc]
+
+class _AwaitableResponse:
+    """A botocore response of moto, that aiobotocore awaits for an async one."""
+
+    def __init__(self, response: Any) -> None:  # noqa: ANN401
+        self.response = response
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        return getattr(self.response, name)
+
+    def __await__(self) -> Generator[Any, None, Any]:
+        return self._aio_response().__await__()
+
+    async def _aio_response(self) -> Any:  # noqa: ANN401
+        from aiobotocore.awsrequest import AioAWSResponse
+
+        response = self.response
+        return AioAWSResponse(
+            response.url,
+            response.status_code,
+            response.headers,
+            _AioRawResponse(response.url, response.content),
+        )
+
+
+class _AioStubber:
+    """Make moto's botocore stubber usable by aiobotocore (and s3fs).
+
+    moto does not support aiobotocore: the stubber can't read its async
+    request bodies, and returns responses whose content can't be awaited.
+    The responses are returned as they are to botocore, and awaited by
+    aiobotocore's event emitter, which awaits the results of the handlers.
+    """
+
+    def __init__(self, stubber: Callable[..., Any]) -> None:
+        self.stubber = stubber
+
+    def __call__(
+        self,
+        event_name: str,
+        request: Any,  # noqa: ANN401
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Any:  # noqa: ANN401
+        read = getattr(request.body, "read", None)
+        if read is not None and inspect.iscoroutinefunction(read):
+            # only aiobotocore streams request bodies asynchronously
+            return self._aio_call(event_name, request, **kwargs)
+        return self._call(event_name, request, **kwargs)
+
+    def _call(
+        self,
+        event_name: str,
+        request: Any,  # noqa: ANN401
+        **kwargs: Any,  # noqa: ANN401
+    ) -> _AwaitableResponse | None:
+        response = self.stubber(event_name, request, **kwargs)
+        if response is None:
+            return None
+        return _AwaitableResponse(response)
+
+    async def _aio_call(
+        self,
+        event_name: str,
+        request: Any,  # noqa: ANN401
+        **kwargs: Any,  # noqa: ANN401
+    ) -> Any:  # noqa: ANN401
+        request.body = await request.body.read()
+        response = self._call(event_name, request, **kwargs)
+        return None if response is None else await response
+
+
+def _patch_moto_stubber() -> Callable[[], None]:
+    """Wrap moto's stubber for the botocore sessions created from now on.
+
+    Returns a function undoing it.
+    """
+    from botocore.handlers import BUILTIN_HANDLERS
+    from moto.core.models import botocore_stubber
+
+    # entries are (event, handler) or (event, handler, register type)
+    index = next(
+        i
+        for i, entry in enumerate(BUILTIN_HANDLERS)
+        if entry[0] == "before-send" and entry[1] is botocore_stubber
+    )
+    BUILTIN_HANDLERS[index] = ("before-send", _AioStubber(botocore_stubber))
+
+    def restore() -> None:
+        BUILTIN_HANDLERS[index] = ("before-send", botocore_stubber)
+
+    return restore
+
+
+# values of the "backend" key of `s3_server_config`
+S3_BACKENDS: dict[
+    str,
+    type[MockedS3Server | MockedS3ServerProcess | InProcessS3Backend],
+] = {
+    "server": MockedS3Server,
+    "process": MockedS3ServerProcess,
+    "inprocess": InProcessS3Backend,
+}
+
+
+def start_s3_server(
+    config: dict,
+) -> tuple[dict, MockedS3Server | MockedS3ServerProcess | InProcessS3Backend]:
+    """Start a moto server with the given `s3_server_config`.
+
+    Returns the config along with the running server.
+    """
+    kwargs = dict(config)
+    backend = kwargs.pop("backend", "server")
+    try:
+        cls = S3_BACKENDS[backend]
+    except KeyError:
+        msg = f"unknown s3 {backend=}, expected one of {', '.join(S3_BACKENDS)}"
+        raise ValueError(msg) from None
+    server = cls(**kwargs)
+    server.start()
+    return config, server
+
+
+def is_moto_healthy(endpoint_url: str) -> bool:
+    return requests.get(f"{endpoint_url}/moto-api/", timeout=1).ok
+
+
+@contextmanager
+def shared_s3_server(
+    lock_dir: Path,
+    worker_id: str,
+    config: dict,
+) -> Iterator[str]:
+    """Attach to a moto server shared by all the workers using `lock_dir`.
+
+    The first worker launches the server in a child process and records its
+    endpoint in a state file, the other workers attach to it. The last worker
+    to detach shuts the server down, workers that died without detaching are
+    ignored. Yields the endpoint url.
+    """
+    config_hash = hashlib.sha256(
+        json.dumps(config, sort_keys=True).encode(),
+    ).hexdigest()[:8]
+    state_file = lock_dir / f"s3_server-{config_hash}.json"
+    lock = FileLock(lock_dir / f"s3_server-{config_hash}.lock")
+
+    server: MockedS3ServerProcess | None = None
+    with lock:
+        state = _read_state(state_file)
+        if state is not None and not _is_alive(state["endpoint_url"]):
+            logger.warning("shared moto server is not responding, restarting it")
+            _terminate(state["pid"])
+            state = None
+        if state is None:
+            server = MockedS3ServerProcess(**config)
+            server.start()
+            state = {"endpoint_url": server.endpoint_url, "pid": server.pid}
+            state["workers"] = {}
+        state["workers"] = _live_workers(state)
+        state["workers"][worker_id] = os.getpid()
+        state_file.write_text(json.dumps(state))
+
+    detached = False
+
+    def detach() -> None:
+        nonlocal detached
+        if detached:
+            return
+        detached = True
+        with lock:
+            current = _read_state(state_file)
+            if current is not None and current["pid"] == state["pid"]:
+                current["workers"].pop(worker_id, None)
+                current["workers"] = _live_workers(current)
+                if current["workers"]:
+                    state_file.write_text(json.dumps(current))
+                    return
+                state_file.unlink()
+            elif server is None:
+                # stopped by the last worker, or replaced after it stopped
+                # responding
+                return
+            if server is not None:
+                server.stop()
+            else:
+                _terminate(state["pid"])
+
+    # the fixture is not torn down when the session is interrupted
+    atexit.register(detach)
+    try:
+        yield state["endpoint_url"]
+    finally:
+        detach()
+        atexit.unregister(detach)
+
+
+def _read_state(state_file: Path) -> dict[str, Any] | None:
+    try:
+        return json.loads(state_file.read_text())
+    except FileNotFoundError:
+        return None
+
+
+def _live_workers(state: dict[str, Any]) -> dict[str, int]:
+    # workers that crashed or were restarted never detach
+    return {worker: pid for worker, pid in state["workers"].items() if _pid_exists(pid)}
+
+
+def _pid_exists(pid: int) -> bool:
+    if sys.platform == "win32":
+        # signal 0 terminates the process on windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _terminate(pid: int) -> None:
+    with suppress(OSError):
+        os.kill(pid, signal.SIGTERM)
+
+
+def s3_service() -> str | None:
+    """Return the endpoint URL of the moto server started by ``pytest-servers up``."""
+    info = get_service("s3", lambda info: is_moto_healthy(info["endpoint_url"]))
+    return info["endpoint_url"] if info else None
+
+
+def _is_alive(endpoint_url: str) -> bool:
+    try:
+        return is_moto_healthy(endpoint_url)
+    except requests.RequestException:
+        return False
+
+
+def run_s3_server(
     monkeypatch_session: pytest.MonkeyPatch,
     s3_server_config: dict,
-) -> dict[str, str | None]:
-    """Spins up a moto s3 server.
+    tmp_path_factory: pytest.TempPathFactory,
+    request: pytest.FixtureRequest,
+) -> Iterator[dict[str, str | None]]:
+    """Spin up a moto s3 server for the `s3_server` fixture.
 
-    Returns a client_kwargs dict that can be used with a boto client.
+    Yields a client_kwargs dict that can be used with a boto client.
     """
     assert isinstance(s3_server_config, dict)
     monkeypatch_session.setenv("MOTO_ALLOW_NONEXISTENT_REGION", "true")
 
-    with MockedS3Server(**s3_server_config) as server:
-        yield {
-            "endpoint_url": server.endpoint_url,
-            "aws_access_key_id": "pytest-servers",
-            "aws_secret_access_key": "pytest-servers",
-            "aws_session_token": "pytest-servers",
-            "region_name": "pytest-servers-region",
-        }
+    if not s3_server_config and (endpoint_url := s3_service()):
+        # started with the default config
+        yield {"endpoint_url": endpoint_url, **MOTO_CREDENTIALS}
+        return
+
+    config = dict(s3_server_config)
+    shared = config.pop("shared", False)
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER")
+    if shared and config.get("backend", "server") not in ("server", "process"):
+        msg = "a shared s3 server requires the server or process backend"
+        raise ValueError(msg)
+    if shared and worker_id:
+        # the shared server always runs in a child process
+        config.pop("backend", None)
+        root_tmp_dir = tmp_path_factory.getbasetemp().parent
+        with shared_s3_server(root_tmp_dir, worker_id, config) as endpoint_url:
+            yield {"endpoint_url": endpoint_url, **MOTO_CREDENTIALS}
+        return
+
+    server = None
+    prestarted = get_prestarted(request.config, "s3_server")
+    if prestarted is not None:
+        prestarted_config, server = prestarted.result()
+        if prestarted_config != s3_server_config:
+            server.stop()
+            server = None
+    if server is None:
+        _, server = start_s3_server(config)
+
+    try:
+        yield {"endpoint_url": server.endpoint_url, **MOTO_CREDENTIALS}
+    finally:
+        server.stop()
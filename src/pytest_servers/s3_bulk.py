@@ -0,0 +1,99 @@
+"""Bulk population of the moto S3 backend running in this process.
+
+Creating millions of keys with PUT requests takes hours. Here the keys are
+added to moto's data structures directly, without HTTP: the first key is
+created by moto itself, and the other ones only store their name and fall
+back to the first key for everything else (contents, ETag, metadata, ...).
+"""
+
+from __future__ import annotations
+
+import io
+import uuid
+from typing import TYPE_CHECKING, Any
+
+from moto.s3.models import FakeKey, s3_backends
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+
+class _SharedBuffer(io.BytesIO):
+    """Contents shared by the keys, which moto closes once per deleted key."""
+
+    def close(self) -> None:
+        pass
+
+
+class _PopulatedKey(FakeKey):
+    """A key reading the attributes it does not set from `_template`.
+
+    Attributes set by moto later on, e.g. when the key is deleted or its ACL
+    changed, only apply to this key.
+    """
+
+    _template: FakeKey
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        if name == "_template":
+            # not set yet, e.g. while unpickling
+            raise AttributeError(name)
+        return getattr(self._template, name)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # copies, e.g. when listing versions, are standalone
+        state = {**self._template.__getstate__(), **self.__dict__}
+        del state["_template"]
+        return state
+
+    def __del__(self) -> None:
+        # the shared buffer is not a temporary file that could leak
+        pass
+
+
+def _moto_bucket(bucket_name: str) -> tuple[Any, Any]:
+    for account_id in list(s3_backends):
+        for backend in s3_backends[account_id].values():
+            if bucket_name in backend.buckets:
+                return backend, backend.buckets[bucket_name]
+    msg = (
+        f"bucket {bucket_name!r} is not in a moto backend of this process, "
+        "populating it directly needs the server or inprocess s3 backend"
+    )
+    raise ValueError(msg)
+
+
+def populate_moto(bucket_name: str, keys: Iterable[str], data: bytes = b"") -> int:
+    """Create the objects `keys` with the contents `data` in `bucket_name`.
+
+    `keys` is consumed lazily. With versioning enabled, every key gets a new
+    version. Returns the number of keys created.
+    """
+    backend, bucket = _moto_bucket(bucket_name)
+    names = iter(keys)
+    first = next(names, None)
+    if first is None:
+        return 0
+    template = backend.put_object(bucket_name, first, data)
+    template._value_buffer = _SharedBuffer(data)  # noqa: SLF001
+    # computed once, from the contents of all the keys
+    _ = template.etag
+
+    store = bucket.keys
+    versioned = bucket.is_versioned
+    count = 1
+    for name in names:
+        # unlike FakeKey(), not tracked by moto for the lifetime of the process
+        key = object.__new__(_PopulatedKey)
+        key._template = template  # noqa: SLF001
+        key.name = name
+        if versioned:
+            key._version_id = str(uuid.uuid4())  # noqa: SLF001
+            store[name] = key
+        elif name in store:
+            # disposes of the replaced key
+            store.setlist(name, [key])
+        else:
+            dict.__setitem__(store, name, [key])
+        count += 1
+    return count
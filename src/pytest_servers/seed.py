@@ -0,0 +1,124 @@
+"""Datasets that are materialized once per session and cloned for each test."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import sys
+from contextlib import suppress
+from typing import TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from upath import UPath
+
+# a local directory, or a callable populating the given local directory
+SeedSource = Union[str, os.PathLike, "Callable[[Path], None]"]
+
+SEED_MARKER = ".pytest-servers-seed"
+
+# ioctl sharing the data of two files on copy-on-write filesystems (linux/fs.h)
+FICLONE = 0x40049409
+
+
+def seed_files(directory: Path) -> list[str]:
+    """Sorted posix paths of the files in `directory`, relative to it."""
+    return sorted(
+        path.relative_to(directory).as_posix()
+        for path in directory.rglob("*")
+        if path.is_file()
+    )
+
+
+def seed_digest(directory: Path) -> str:
+    """Hash of the names and contents of the files in `directory`."""
+    digest = hashlib.sha256()
+    for name in seed_files(directory):
+        digest.update(name.encode() + b"\0")
+        with (directory / name).open("rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def materialize_seed(seed: SeedSource, directory: Path) -> None:
+    """Write the seed to the empty local `directory`."""
+    directory.mkdir(parents=True, exist_ok=True)
+    if callable(seed):
+        seed(directory)
+    else:
+        shutil.copytree(seed, directory, dirs_exist_ok=True)
+
+
+def clone_file(src: Path, dst: Path) -> None:
+    """Copy `src` to `dst`, as a reflink on filesystems that support it.
+
+    The copy is independent of `src`, but shares its blocks on btrfs, xfs,
+    ... until either of them is written to.
+    """
+    if sys.platform == "linux":
+        import fcntl
+
+        with src.open("rb") as fsrc, dst.open("wb") as fdst, suppress(OSError):
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return
+    shutil.copyfile(src, dst)
+
+
+def clone_local(seed_dir: Path, dst: Path) -> None:
+    """Clone the seed with reflinks, copying when they are not supported."""
+    for name in seed_files(seed_dir):
+        target = dst / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        clone_file(seed_dir / name, target)
+
+
+def read_seed(seed_dir: Path) -> dict[str, bytes]:
+    return {name: (seed_dir / name).read_bytes() for name in seed_files(seed_dir)}
+
+
+def clone_memory(blobs: dict[str, bytes], dst: UPath) -> None:
+    """Clone the seed into a memory path.
+
+    The files are created from the same bytes objects, which their buffers
+    share until a clone is written to.
+    """
+    from fsspec.implementations.memory import MemoryFile
+
+    fs = dst.fs
+    root = dst.path.rstrip("/")
+    for name, data in blobs.items():
+        path = f"{root}/{name}"
+        fs.store[path] = MemoryFile(fs, path, data)
+
+
+def upload_seed(seed_dir: Path, seed_root: UPath) -> None:
+    """Upload the seed to `seed_root` unless an earlier session already did."""
+    fs = seed_root.fs
+    marker = f"{seed_root.path.rstrip('/')}/{SEED_MARKER}"
+    if fs.exists(marker):
+        return
+    fs.makedirs(seed_root.path, exist_ok=True)
+    names = seed_files(seed_dir)
+    data = seed_root / "data"
+    fs.put(
+        [os.fspath(seed_dir / name) for name in names],
+        [f"{data.path}/{name}" for name in names],
+    )
+    # the marker goes last, so that partial uploads are never reused
+    fs.pipe_file(marker, b"")
+
+
+def clone_remote(seed_root: UPath, dst: UPath) -> None:
+    """Clone the seed with server-side copies."""
+    fs = seed_root.fs
+    data = (seed_root / "data").path.rstrip("/")
+    sources = fs.find(data)
+    if not sources:
+        return
+    root = dst.path.rstrip("/")
+    fs.copy(sources, [f"{root}/{src[len(data) + 1 :]}" for src in sources])
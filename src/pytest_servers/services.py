@@ -0,0 +1,54 @@
+"""Mock remotes started outside of pytest with ``pytest-servers up``.
+
+Their endpoints are recorded in a state file (see
+:mod:`pytest_servers.containers`), which the server fixtures check before
+starting a remote of their own.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any
+
+from .containers import read_state, update_state
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+SERVICES = ("s3", "azure", "gcs")
+
+_STATE = "services"
+
+
+def read_services() -> dict[str, dict[str, Any]]:
+    return read_state(_STATE) or {}
+
+
+def save_service(name: str, **info: Any) -> None:  # noqa: ANN401
+    with update_state(_STATE) as state:
+        state[name] = info
+
+
+def remove_service(name: str) -> dict[str, Any] | None:
+    with update_state(_STATE) as state:
+        return state.pop(name, None)
+
+
+def get_service(
+    name: str,
+    is_healthy: Callable[[dict[str, Any]], bool],
+) -> dict[str, Any] | None:
+    """Return the info of the service `name` if it is up and healthy."""
+    info = read_services().get(name)
+    if info is None:
+        return None
+    try:
+        healthy = is_healthy(info)
+    except Exception:  # noqa: BLE001
+        healthy = False
+    if not healthy:
+        logger.warning("%s service is not responding, ignoring it", name)
+        return None
+    return info
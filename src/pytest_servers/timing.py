@@ -0,0 +1,80 @@
+"""Durations of the provisioning phases of the mock remotes and temporary paths."""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+class PhaseSummary(NamedTuple):
+    phase: str
+    calls: int
+    total: float
+    p50: float
+    p95: float
+    p99: float
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of sorted `values`."""
+    rank = max(math.ceil(q / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+class Timings:
+    """Durations recorded for each phase, in seconds."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._durations: defaultdict[str, list[float]] = defaultdict(list)
+
+    def __bool__(self) -> bool:
+        return bool(self._durations)
+
+    def record(self, phase: str, duration: float) -> None:
+        with self._lock:
+            self._durations[phase].append(duration)
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def merge(self, durations: dict[str, list[float]]) -> None:
+        with self._lock:
+            for phase, values in durations.items():
+                self._durations[phase].extend(values)
+
+    def to_dict(self) -> dict[str, list[float]]:
+        with self._lock:
+            return {phase: list(values) for phase, values in self._durations.items()}
+
+    def summary(self) -> list[PhaseSummary]:
+        result = []
+        for phase, values in sorted(self.to_dict().items()):
+            values.sort()
+            result.append(
+                PhaseSummary(
+                    phase,
+                    len(values),
+                    sum(values),
+                    percentile(values, 50),
+                    percentile(values, 95),
+                    percentile(values, 99),
+                ),
+            )
+        return result
+
+
+# timings of the current process
+timings = Timings()
@@ -1,4 +1,5 @@
 import logging
+import os
 import random
 import socket
 import string
@@ -6,11 +7,8 @@ import time
 from collections.abc import Callable
 from typing import TYPE_CHECKING, NamedTuple, TypeVar
 
-import pytest
-
 if TYPE_CHECKING:
-    from docker import DockerClient
-    from docker.models.containers import Container
+    from pathlib import Path
 
 
 logger = logging.getLogger(__name__)
@@ -43,36 +41,11 @@ def random_string(n: int = 6) -> str:
     )
 
 
-@pytest.fixture(scope="session")
-def monkeypatch_session() -> pytest.MonkeyPatch:  # type: ignore[misc]
-    """Session-scoped monkeypatch."""
-    m = pytest.MonkeyPatch()
-    yield m
-    m.undo()
-
-
-@pytest.fixture(scope="session")
-def docker_client() -> "DockerClient":
-    """Run docker commands using the python API."""
-    import docker
-
-    client = docker.from_env()
-
-    yield client
-
-    client.close()
-
-
-def wait_until_running(
-    container: "Container",
-    timeout: int = 30,
-    pause: float = 0.5,
-) -> None:
-    def check() -> bool:
-        container.reload()
-        return container.status == "running"
-
-    wait_until(check, timeout=timeout, pause=pause)
+def write_atomic(path: "Path", text: str) -> None:
+    """Write `path` through a rename, readers without a lock never see it partial."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    tmp.replace(path)
 
 
 def get_free_port() -> int:
@@ -0,0 +1,151 @@
+# fsspec names its async methods with a leading underscore
+# ruff: noqa: SLF001
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import boto3
+import pytest
+
+from pytest_servers.factory import TempUPathFactory
+from pytest_servers.prestart import Prestart
+
+
+def bucket_exists(s3_server, path):
+    client = boto3.client("s3", **s3_server)
+    buckets = client.list_buckets()["Buckets"]
+    return path.path.strip("/") in [bucket["Name"] for bucket in buckets]
+
+
+def test_amktemp_s3(tmp_upath_factory, s3_server):
+    async def main():
+        path = await tmp_upath_factory.amktemp("s3")
+        other = await tmp_upath_factory.amktemp("s3")
+        assert path.fs.asynchronous
+        # the paths of a loop share their filesystem
+        assert path.fs is other.fs
+        assert (path / "foo").fs is path.fs
+
+        await asyncio.gather(
+            *(path.fs._pipe_file((path / str(i)).path, b"x") for i in range(100)),
+        )
+        assert len(await path.fs._find(path.path)) == 100
+        await tmp_upath_factory.aclose()
+        return path
+
+    path = asyncio.run(main())
+    assert bucket_exists(s3_server, path)
+
+
+def test_amktemp_s3_versioned(tmp_upath_factory):
+    async def main():
+        path = await tmp_upath_factory.amktemp("s3", version_aware=True)
+        foo = (path / "foo").path
+        await path.fs._pipe_file(foo, b"foo")
+        await path.fs._pipe_file(foo, b"bar")
+        assert len(await path.fs._object_version_info(foo)) == 2
+        await tmp_upath_factory.aclose()
+
+    asyncio.run(main())
+
+
+def test_amktemp_cleanup(s3_server):
+    factory = TempUPathFactory(s3_client_kwargs=s3_server)
+
+    async def main():
+        path = await factory.amktemp("s3")
+        await path.fs._pipe_file((path / "foo").path, b"foo")
+        await factory.aclose()
+        return path
+
+    # removed with the scope, once the event loop is gone
+    with factory.scope():
+        path = asyncio.run(main())
+    factory.close()
+    assert not bucket_exists(s3_server, path)
+
+
+@pytest.mark.parametrize("fs", ["local", "memory"])
+def test_amktemp_local(tmp_upath_factory, fs):
+    async def main():
+        return await tmp_upath_factory.amktemp(fs)
+
+    path = asyncio.run(main())
+    assert path.exists()
+    assert not list(path.iterdir())
+
+
+def test_amktemp_waits_for_prestart(s3_server):
+    prestart = Prestart()
+    prestart.submit("s3_server", lambda: time.sleep(0.2))
+    requested = []
+
+    def getfixturevalue(name):
+        # the prestarted remote is ready by the time its fixture is set up
+        assert prestart.get(name).done()
+        requested.append(name)
+        return s3_server
+
+    factory = TempUPathFactory()
+    factory._request = SimpleNamespace(
+        config=SimpleNamespace(
+            pluginmanager=SimpleNamespace(get_plugin=lambda _: prestart),
+        ),
+        getfixturevalue=getfixturevalue,
+        node=SimpleNamespace(addfinalizer=lambda _: None),
+    )
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(tick())
+        await factory.amktemp("s3")
+        task.cancel()
+        await factory.aclose()
+        return ticks
+
+    # the loop kept running while the remote started
+    assert asyncio.run(main()) > 5
+    assert requested == ["s3_server"]
+    factory.close()
+    prestart.close()
+
+
+@pytest.mark.parametrize("kwarg", ["isolation", "seed", "backing", "faults"])
+def test_amktemp_unsupported(tmp_upath_factory, kwarg):
+    async def main():
+        await tmp_upath_factory.amktemp("s3", **{kwarg: None})
+
+    with pytest.raises(TypeError, match=kwarg):
+        asyncio.run(main())
+
+
+async def _write_read(path):
+    foo = (path / "foo").path
+    await path.fs._pipe_file(foo, b"foo")
+    assert await path.fs._cat_file(foo) == b"foo"
+
+
+@pytest.mark.asyncio
+async def test_async_tmp_s3_path(async_tmp_s3_path):
+    assert async_tmp_s3_path.fs.asynchronous
+    await _write_read(async_tmp_s3_path)
+
+
+@pytest.mark.asyncio
+async def test_async_tmp_azure_path(async_tmp_azure_path):
+    assert async_tmp_azure_path.fs.asynchronous
+    await _write_read(async_tmp_azure_path)
+
+
+@pytest.mark.asyncio
+async def test_async_tmp_gcs_path(async_tmp_gcs_path):
+    assert async_tmp_gcs_path.fs.asynchronous
+    await _write_read(async_tmp_gcs_path)
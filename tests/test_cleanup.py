@@ -0,0 +1,102 @@
+import pytest
+
+from pytest_servers.factory import TempUPathFactory
+
+pytest_plugins = ["pytester"]
+
+
+@pytest.fixture
+def s3_factory(s3_server):
+    factory = TempUPathFactory(s3_client_kwargs=s3_server)
+    yield factory
+    factory.close()
+
+
+def test_memory_path_removed_with_scope():
+    factory = TempUPathFactory()
+    with factory.scope():
+        path = factory.mktemp("memory")
+        (path / "foo").write_text("foo")
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("version_aware", [False, True])
+def test_s3_bucket_removed_with_scope(s3_factory, version_aware):
+    with s3_factory.scope():
+        path = s3_factory.mktemp("s3", version_aware=version_aware)
+        (path / "foo").write_text("foo")
+        (path / "foo").write_text("bar")
+    s3_factory.close()
+
+    path.fs.invalidate_cache()
+    assert not path.fs.exists(path.path)
+
+
+def test_prefix_removed_with_scope(s3_factory):
+    with s3_factory.scope():
+        path = s3_factory.mktemp("s3", isolation="prefix")
+        (path / "foo").write_text("foo")
+        other = s3_factory.mktemp("s3", isolation="prefix")
+
+    session_bucket = path.parent
+    s3_factory.close()
+    path.fs.invalidate_cache()
+    assert not path.fs.exists(session_bucket.path)
+    assert not other.exists()
+
+
+def test_paths_outside_scope_removed_on_close():
+    factory = TempUPathFactory()
+    path = factory.mktemp("memory")
+    (path / "foo").write_text("foo")
+    assert path.exists()
+    factory.close()
+    assert not path.exists()
+
+
+def test_keep_data():
+    factory = TempUPathFactory(keep_data=True)
+    with factory.scope():
+        path = factory.mktemp("memory")
+        (path / "foo").write_text("foo")
+    factory.close()
+    assert (path / "foo").read_text() == "foo"
+
+
+def test_paths_removed_with_module_and_class(pytester):
+    pytester.makepyfile(
+        test_a="""
+        import pytest
+
+        paths = {}
+
+        @pytest.fixture(scope="module")
+        def module_path(tmp_upath_factory):
+            paths["module"] = tmp_upath_factory.mktemp("memory")
+            return paths["module"]
+
+        class TestClass:
+            @pytest.fixture(scope="class")
+            def class_path(self, tmp_upath_factory):
+                paths["class"] = tmp_upath_factory.mktemp("memory")
+                return paths["class"]
+
+            def test_first(self, module_path, class_path):
+                assert class_path.exists()
+
+            def test_second(self, class_path):
+                assert class_path.exists()
+
+        def test_after_class(module_path):
+            assert not paths["class"].exists()
+            assert module_path.exists()
+        """,
+        test_b="""
+        import sys
+
+        def test_after_module():
+            assert not sys.modules["test_a"].paths["module"].exists()
+        """,
+    )
+    result = pytester.runpytest("-p", "no:randomly")
+    result.assert_outcomes(passed=4)
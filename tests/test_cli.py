@@ -0,0 +1,55 @@
+import pytest
+
+from pytest_servers.cli import main
+from pytest_servers.services import read_services
+
+pytest_plugins = ["pytester"]
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+
+@pytest.fixture
+def s3_up(state_dir):
+    assert main(["up", "s3"]) == 0
+    yield read_services()["s3"]["endpoint_url"]
+    main(["down", "s3"])
+
+
+def test_up_status_down(state_dir, capsys):
+    assert main(["status", "s3"]) == 1
+    assert capsys.readouterr().out == "s3: down\n"
+
+    assert main(["up", "s3"]) == 0
+    endpoint_url = read_services()["s3"]["endpoint_url"]
+    assert capsys.readouterr().out == f"s3: running at {endpoint_url}\n"
+
+    assert main(["up", "s3"]) == 0
+    assert capsys.readouterr().out == f"s3: already running at {endpoint_url}\n"
+
+    assert main(["status", "s3"]) == 0
+    assert capsys.readouterr().out == f"s3: up: {endpoint_url}\n"
+
+    assert main(["down", "s3"]) == 0
+    assert capsys.readouterr().out == "s3: stopped\n"
+    assert "s3" not in read_services()
+
+
+def test_unknown_service(capsys):
+    with pytest.raises(SystemExit):
+        main(["up", "s4"])
+    assert "unknown services: s4" in capsys.readouterr().err
+
+
+def test_plugin_uses_service(pytester, s3_up):
+    pytester.makepyfile(
+        f"""
+        def test_s3(s3_server, tmp_s3_path):
+            assert s3_server["endpoint_url"] == "{s3_up}"
+            (tmp_s3_path / "foo").write_text("foo")
+        """,
+    )
+    result = pytester.runpytest("--servers-prestart=s3")
+    result.assert_outcomes(passed=1)
@@ -0,0 +1,43 @@
+from upath import UPath
+
+from pytest_servers.clients import ClientCache
+
+
+def test_s3_client_is_cached_by_kwargs(s3_server):
+    cache = ClientCache()
+    client = cache.s3(s3_server)
+    assert cache.s3(dict(s3_server)) is client
+    assert cache.s3({**s3_server, "region_name": "us-east-1"}) is not client
+
+    assert client.list_buckets()["ResponseMetadata"]["HTTPStatusCode"] == 200
+    cache.close()
+    assert cache.s3(s3_server) is not client
+
+
+def test_filesystems_closed(s3_server):
+    cache = ClientCache()
+    path = UPath(
+        "s3://pytest-servers-filesystems",
+        endpoint_url=s3_server["endpoint_url"],
+        client_kwargs=s3_server,
+    )
+    path.mkdir()
+    cache.add_filesystem(path.fs)
+    cache.add_filesystem(path.fs)
+    cache.close()
+
+    # the filesystem reconnects if it is used again
+    assert path.exists()
+
+
+def test_close_evicts_own_filesystems(s3_server):
+    cache = ClientCache()
+    options = {"endpoint_url": s3_server["endpoint_url"], "client_kwargs": s3_server}
+    fs = UPath("s3://pytest-servers-evict", **options).fs
+    other = UPath("s3://pytest-servers-evict", **options, anon=False).fs
+    assert other is not fs
+    cache.add_filesystem(fs)
+    cache.close()
+
+    assert UPath("s3://pytest-servers-evict", **options).fs is not fs
+    assert UPath("s3://pytest-servers-evict", **options, anon=False).fs is other
@@ -0,0 +1,330 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+from docker.errors import DockerException, NotFound
+
+from pytest_servers import azure, containers, gcs
+from pytest_servers.containers import (
+    LABEL_FINGERPRINT,
+    LABEL_PERSISTENT,
+    cached_port,
+    container_config,
+    fingerprint,
+    get_container,
+    read_state,
+    reap,
+    register_failure,
+    register_port,
+    registered_port,
+    release_container,
+    save_container,
+    update_state,
+)
+from pytest_servers.exceptions import RemoteUnavailable
+from pytest_servers.factory import TempUPathFactory
+
+
+class FakeContainer:
+    def __init__(self, id_, labels, status="running"):
+        self.id = id_
+        self.labels = labels
+        self.status = status
+        self.removed = False
+
+    def start(self):
+        self.status = "running"
+
+    def reload(self):
+        pass
+
+    def remove(self, force):
+        self.removed = True
+
+
+class FakeContainers:
+    def __init__(self, *containers):
+        self._containers = {c.id: c for c in containers}
+
+    def get(self, name):
+        try:
+            return self._containers[name]
+        except KeyError:
+            raise NotFound(name) from None
+
+
+class FakeClient:
+    def __init__(self, *containers):
+        self.containers = FakeContainers(*containers)
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    return tmp_path / "pytest-servers"
+
+
+def test_state_dir_created_on_write(state_dir):
+    assert read_state("name") is None
+    assert not state_dir.exists()
+    with update_state("name") as state:
+        state["foo"] = "bar"
+    assert read_state("name") == {"foo": "bar"}
+
+
+def test_state_dir_relative_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", "relative")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert containers.state_dir() == tmp_path / ".cache" / "pytest-servers"
+
+
+def test_fingerprint():
+    fp = fingerprint("image:1", "--flag", [1, 2])
+    assert fp == fingerprint("image:1", "--flag", [2, 1])
+    assert fp != fingerprint("image:2", "--flag", [1, 2])
+    assert fp != fingerprint("image:1", "--other", [1, 2])
+    assert fp != fingerprint("image:1", "--flag", [1])
+    assert fp == fingerprint("image:1", "--flag", [1, 2], {})
+    assert fp != fingerprint("image:1", "--flag", [1, 2], {"mem_limit": "1g"})
+
+
+def test_container_config_default():
+    config = container_config("name", "image:1", "--flag", [1])
+    assert config.name == "name"
+    assert config.fingerprint == fingerprint("image:1", "--flag", [1])
+    assert config.command("--flag") == "--flag"
+    assert config.options == {}
+    assert container_config("name", "image:1", "--flag", [1], {"image": "image:1"}) == (
+        config
+    )
+
+
+def test_container_config():
+    config = container_config(
+        "name",
+        "image:1",
+        "--flag ",
+        [1],
+        {
+            "image": "image:2",
+            "args": ["--inMemoryPersistence", "--location", "/tmp/a b"],
+            "tmpfs": {"/data": "size=1g"},
+            "mem_limit": "1g",
+            "cpus": 1.5,
+        },
+    )
+    assert config.name == f"name-{config.fingerprint[:8]}"
+    assert config.image == "image:2"
+    assert config.command("--flag ") == (
+        "--flag --inMemoryPersistence --location '/tmp/a b'"
+    )
+    assert config.options == {
+        "tmpfs": {"/data": "size=1g"},
+        "mem_limit": "1g",
+        "nano_cpus": 1_500_000_000,
+    }
+    other = container_config("name", "image:1", "--flag", [1], {"mem_limit": "2g"})
+    assert other.name != config.name
+
+
+def test_container_config_unknown():
+    with pytest.raises(ValueError, match="unknown container config"):
+        container_config("name", "image", "", [], {"memory": "1g"})
+
+
+def test_get_container():
+    fp = fingerprint("image", "", [])
+    container = FakeContainer("name", {LABEL_FINGERPRINT: fp}, status="exited")
+    assert get_container(FakeClient(container), "name", fp) is container
+    assert container.status == "running"
+    assert not container.removed
+
+
+def test_get_container_missing():
+    assert get_container(FakeClient(), "name", "fp") is None
+
+
+@pytest.mark.parametrize(
+    ("labels", "persistent"),
+    [
+        ({}, False),
+        ({LABEL_FINGERPRINT: "other"}, False),
+        ({LABEL_FINGERPRINT: "fp", LABEL_PERSISTENT: "false"}, True),
+    ],
+)
+def test_get_container_stale(labels, persistent):
+    container = FakeContainer("name", labels)
+    client = FakeClient(container)
+    assert get_container(client, "name", "fp", persistent=persistent) is None
+    assert container.removed
+
+
+def test_cached_port():
+    container = FakeContainer("abc", {})
+    save_container("name", "fp", container, "1234")
+    assert read_state("name")["sessions"] == [os.getpid()]
+
+    assert cached_port("name", "fp", lambda port: port == "1234") == "1234"
+    assert cached_port("name", "other", lambda _: True) is None
+    assert cached_port("name", "fp", lambda _: False) is None
+
+    def unreachable(port):
+        raise ConnectionError
+
+    assert cached_port("name", "fp", unreachable) is None
+
+
+def test_registered_port(tmp_path):
+    registry = tmp_path / "name.json"
+    assert registered_port(registry, "fp", lambda _: True) is None
+
+    register_port(registry, "fp", FakeContainer("abc", {}), "1234")
+    assert json.loads(registry.read_text())["container_id"] == "abc"
+    assert registered_port(registry, "fp", lambda port: port == "1234") == "1234"
+    assert registered_port(registry, "other", lambda _: True) is None
+    assert registered_port(registry, "fp", lambda _: False) is None
+    assert list(tmp_path.iterdir()) == [registry]
+
+
+def test_registered_failure(monkeypatch, tmp_path):
+    registry = tmp_path / "name.json"
+    # without xdist, the directory is shared by the following sessions
+    monkeypatch.delenv("PYTEST_XDIST_WORKER", raising=False)
+    register_failure(registry, "fp", "bad image")
+    assert not registry.exists()
+
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw0")
+    register_failure(registry, "fp", "bad image")
+    with pytest.raises(RemoteUnavailable, match="bad image"):
+        registered_port(registry, "fp", lambda _: True)
+    assert registered_port(registry, "other", lambda _: True) is None
+
+
+class BrokenClient:
+    @property
+    def containers(self):
+        msg = "docker is down"
+        raise DockerException(msg)
+
+
+@pytest.mark.parametrize(
+    "start",
+    [azure.start_azurite, gcs.start_fake_gcs_server],
+)
+def test_start_failure_is_shared(monkeypatch, tmp_path, start):
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw0")
+    with pytest.raises(DockerException):
+        start(BrokenClient(), tmp_path)
+    # the workers waiting for the lock do not try again
+    with pytest.raises(RemoteUnavailable, match="docker is down"):
+        start(object(), tmp_path)
+
+
+@pytest.mark.parametrize(
+    ("module", "config", "start"),
+    [
+        (azure, azure.azurite_container(), azure.start_azurite),
+        (gcs, gcs.fake_gcs_server_container(), gcs.start_fake_gcs_server),
+    ],
+)
+def test_start_registered(monkeypatch, tmp_path, module, config, start):
+    monkeypatch.setattr(module, "_is_healthy", lambda port: port == "1234")
+    registry = tmp_path / f"{config.name}.json"
+    register_port(registry, config.fingerprint, FakeContainer("abc", {}), "1234")
+
+    # published by another worker: docker is not used
+    assert "localhost:1234" in start(object(), tmp_path)
+
+
+def test_setup_azurite_as_xdist_worker(monkeypatch, tmp_path):
+    # start_azurite takes its lock in the session dir of the factory
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw0")
+    monkeypatch.setattr(azure, "_is_healthy", lambda _: True)
+    monkeypatch.setattr(containers, "wait_for_container", lambda *_, **__: None)
+    config = azure.azurite_container()
+    container = FakeContainer(config.name, {LABEL_FINGERPRINT: config.fingerprint})
+    container.ports = {f"{azure.AZURITE_PORT}/tcp": [{"HostPort": "1234"}]}
+    client = FakeClient(container)
+
+    factory = TempUPathFactory()
+    factory._local_path_factory = SimpleNamespace(  # noqa: SLF001
+        getbasetemp=lambda: tmp_path / "gw0",
+    )
+    factory._request = SimpleNamespace(  # noqa: SLF001
+        getfixturevalue=lambda _: azure.start_azurite(client, tmp_path),
+        node=SimpleNamespace(addfinalizer=lambda _: None),
+        config=SimpleNamespace(option=SimpleNamespace(verbose=0)),
+    )
+    factory._setup_mock_remote("azure")  # noqa: SLF001
+    assert "localhost:1234" in factory._azure_connection_string  # noqa: SLF001
+
+
+def test_start_remote_fixed_port(monkeypatch, tmp_path):
+    runs = []
+
+    def run(image, command, ports, **kwargs):
+        runs.append(command)
+        (host_port,) = ports.values()
+        container = FakeContainer("abc", kwargs["labels"])
+        container.ports = {"4443/tcp": [{"HostPort": str(host_port)}]}
+        return container
+
+    client = FakeClient()
+    client.containers.run = run
+    monkeypatch.setattr(containers, "wait_for_container", lambda *_, **__: None)
+    monkeypatch.setattr(gcs, "_is_healthy", lambda _: True)
+
+    endpoint_url = gcs.start_fake_gcs_server(client, tmp_path)
+    # the server is told the port it is reached at
+    port = endpoint_url.rpartition(":")[2]
+    assert f"-public-host localhost:{port}" in runs[0]
+    # published for the other workers
+    assert gcs.start_fake_gcs_server(object(), tmp_path) == endpoint_url
+
+
+class FakePopen:
+    pid = None
+
+    def __init__(self, args, **kwargs):
+        self.args = args
+
+
+def test_reap_waits_until_idle(monkeypatch):
+    monkeypatch.setattr("pytest_servers.containers.subprocess.Popen", FakePopen)
+    container = FakeContainer("abc", {})
+    save_container("name", "fp", container, "1234")
+    release_container("name", idle_timeout=60)
+    assert read_state("name")["sessions"] == []
+
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        raise StopIteration
+
+    with pytest.raises(StopIteration):
+        reap("name", 60, docker_client=FakeClient(container), sleep=sleep)
+    assert 0 < sleeps[0] <= 60
+    assert not container.removed
+
+    reap("name", 0, docker_client=FakeClient(container), sleep=sleep)
+    assert container.removed
+    assert read_state("name") is None
+
+
+def test_reap_skips_containers_in_use():
+    container = FakeContainer("abc", {})
+    save_container("name", "fp", container, "1234")
+
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        raise StopIteration
+
+    # this session is still using it
+    with pytest.raises(StopIteration):
+        reap("name", 0, docker_client=FakeClient(container), sleep=sleep)
+    assert sleeps == [1]
+    assert not container.removed
@@ -4,6 +4,7 @@ import pytest
 import upath.implementations.cloud
 import upath.implementations.memory
 
+from pytest_servers.factory import TempUPathFactory
 from pytest_servers.local import LocalPath
 
 for module in ["s3fs", "adlfs", "gcsfs"]:
@@ -39,6 +40,12 @@ with_versioning = [
     param for param in implementations if param.values[0] in ("s3", "gcs", "gs")
 ]
 
+remotes = [
+    param
+    for param in implementations
+    if param.values[0] in ("s3", "azure", "gcs", "gs")
+]
+
 
 @pytest.mark.parametrize(
     ("fs", "cls"),
@@ -77,3 +84,68 @@ class TestTmpUPathFactoryVersioning:
     def test_mktemp(self, tmp_upath_factory, fs, cls):
         path = tmp_upath_factory.mktemp(fs, version_aware=True)
         assert path.fs.version_aware
+
+
+@pytest.mark.parametrize(
+    ("fs", "cls"),
+    remotes,
+    ids=[param.values[0] for param in remotes],  # type: ignore[misc]
+)
+class TestTmpUPathFactoryPrefixIsolation:
+    def test_mktemp(self, tmp_upath_factory, fs, cls):
+        path_1 = tmp_upath_factory.mktemp(fs, isolation="prefix")
+        path_2 = tmp_upath_factory.mktemp(fs, isolation="prefix")
+        assert isinstance(path_1, cls)
+        assert path_1.parent == path_2.parent
+        assert path_1 != path_2
+
+        (path_1 / "foo").write_text("foo")
+        assert (path_1 / "foo").read_text() == "foo"
+        assert not (path_2 / "foo").exists()
+
+
+def test_mktemp_prefix_isolation_options(tmp_upath_factory):
+    path = tmp_upath_factory.mktemp("s3", isolation="prefix")
+    options = {"isolation": "prefix", "default_block_size": 1 << 20}
+    path_1 = tmp_upath_factory.mktemp("s3", **options)
+    path_2 = tmp_upath_factory.mktemp("s3", **options)
+    assert path_1.fs.default_block_size == 1 << 20
+    assert path_1.parent.path == path_2.parent.path != path.parent.path
+
+
+def test_mktemp_unknown_isolation(tmp_upath_factory):
+    with pytest.raises(ValueError, match="isolation"):
+        tmp_upath_factory.mktemp("s3", isolation="table")
+
+
+class TestTmpUPathFactoryShm:
+    @pytest.fixture
+    def shm_dir(self, tmp_path):
+        # any directory works as the tmpfs mount
+        return tmp_path / "shm"
+
+    def test_mktemp(self, shm_dir):
+        shm_dir.mkdir()
+        factory = TempUPathFactory(shm_dir=shm_dir)
+        with factory.scope():
+            path = factory.mktemp("local", backing="shm")
+            assert isinstance(path, LocalPath)
+            assert path.is_relative_to(shm_dir)
+            (path / "foo").write_text("foo")
+            other = factory.mktemp("local", backing="shm")
+        assert not path.exists()
+
+        assert other.parent.exists()
+        factory.close()
+        assert not other.parent.exists()
+        assert list(shm_dir.iterdir()) == []
+
+    def test_fallback_to_disk(self, tmp_upath_factory, shm_dir, monkeypatch):
+        monkeypatch.setattr(tmp_upath_factory, "_shm_dir", shm_dir)
+        path = tmp_upath_factory.mktemp("local", backing="shm")
+        assert path.exists()
+        assert not path.is_relative_to(shm_dir)
+
+    def test_backing_for_remote(self, tmp_upath_factory):
+        with pytest.raises(ValueError, match="backing"):
+            tmp_upath_factory.mktemp("memory", backing="shm")
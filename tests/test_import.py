@@ -0,0 +1,60 @@
+import subprocess
+import sys
+
+import pytest
+
+pytest_plugins = ["pytester"]
+
+# only imported by the fixtures that use them
+LAZY_MODULES = (
+    "upath",
+    "fsspec",
+    "requests",
+    "filelock",
+    "docker",
+    "moto",
+    "pytest_servers.factory",
+    "pytest_servers.s3",
+    "pytest_servers.s3_bulk",
+    "pytest_servers.azure",
+    "pytest_servers.gcs",
+    "pytest_servers.proxy",
+)
+
+
+def importtime(module: str) -> dict[str, float]:
+    """Return the cumulative import time of the modules imported by `module`."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import pytest, {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_plugin_imports_lazily():
+    times = importtime("pytest_servers.fixtures")
+    assert "pytest_servers.fixtures" in times
+    assert not [module for module in LAZY_MODULES if module in times]
+
+
+@pytest.mark.parametrize("fixture", ["", "tmp_local_path"])
+def test_session_without_remotes(pytester, fixture):
+    pytester.makepyfile(
+        f"""
+        import sys
+
+        def test_modules({fixture}):
+            assert "requests" not in sys.modules
+            assert "pytest_servers.s3" not in sys.modules
+        """,
+    )
+    result = pytester.runpytest_subprocess("-p", "no:xdist")
+    result.assert_outcomes(passed=1)
@@ -1,3 +1,12 @@
+import pickle
+
+import fsspec
+import pytest
+from upath import UPath
+
+from pytest_servers.factory import TempUPathFactory
+
+
 def test_memory_fs_clean(tmp_upath_factory):
     mempath1 = tmp_upath_factory.mktemp("memory")
     mempath2 = tmp_upath_factory.mktemp("memory")
@@ -11,3 +20,40 @@ def test_memory_fs_clean(tmp_upath_factory):
     assert (mempath2 / "bar").exists()
     assert not (mempath1 / "bar").exists()
     assert not (mempath2 / "foo").exists()
+
+
+def test_memory_fs_url(tmp_upath_factory):
+    path = tmp_upath_factory.mktemp("memory")
+    (path / "foo").write_text("foo")
+
+    assert (UPath(str(path)) / "foo").read_text() == "foo"
+    with fsspec.open(f"{path}/foo", "r") as f:
+        assert f.read() == "foo"
+    assert (pickle.loads(pickle.dumps(path)) / "foo").read_text() == "foo"
+
+
+@pytest.fixture
+def isolated_factory():
+    factory = TempUPathFactory(memory_store="isolated")
+    yield factory
+    factory.close()
+
+
+def test_memory_fs_isolated_store(isolated_factory):
+    mempath1 = isolated_factory.mktemp("memory")
+    mempath2 = isolated_factory.mktemp("memory")
+    (mempath1 / "foo").write_text("foo")
+
+    assert mempath1.fs is not mempath2.fs
+    assert (mempath1 / "dir").fs is mempath1.fs
+    assert list(mempath2.fs.store) == []
+    assert mempath2.fs.find("/") == []
+
+
+def test_memory_fs_store_dropped(isolated_factory):
+    with isolated_factory.scope():
+        path = isolated_factory.mktemp("memory")
+        (path / "dir" / "foo").write_text("foo")
+        fs = path.fs
+    assert fs.store == {}
+    assert not path.exists()
@@ -0,0 +1,56 @@
+import itertools
+
+from upath import UPath
+
+from pytest_servers.factory import TempUPathFactory
+from pytest_servers.pool import BucketPool
+from pytest_servers.utils import wait_until
+
+
+def _wait_until_full(pool):
+    def check():
+        assert len(pool) == pool.size
+
+    wait_until(check, timeout=5)
+
+
+def test_bucket_pool_refills_below_low_water():
+    counter = itertools.count()
+    pool = BucketPool(
+        lambda: UPath(f"memory:/{next(counter)}"),
+        size=4,
+        low_water=2,
+    )
+    try:
+        _wait_until_full(pool)
+        assert pool.get().path == "/0"
+        assert pool.get().path == "/1"
+        assert len(pool) == 2
+
+        # dropping below the low-water mark triggers a refill
+        pool.get()
+        _wait_until_full(pool)
+    finally:
+        remaining = pool.close()
+
+    assert [p.path for p in remaining] == ["/3", "/4", "/5", "/6"]
+
+
+def test_bucket_pool_creates_when_exhausted():
+    pool = BucketPool(lambda: UPath("memory:/bucket"), size=1)
+    pool.close()
+    assert pool.get().path == "/bucket"
+
+
+def test_mktemp_from_bucket_pool(s3_server):
+    factory = TempUPathFactory(s3_client_kwargs=s3_server, bucket_pool_size=2)
+    try:
+        path_1 = factory.mktemp("s3")
+        path_2 = factory.mktemp("s3", version_aware=True)
+        assert str(path_1) != str(path_2)
+        assert path_1.exists()
+        assert path_2.fs.version_aware
+        pools = factory._bucket_pools  # noqa: SLF001
+        assert set(pools) == {("s3", False), ("s3", True)}
+    finally:
+        factory.close()
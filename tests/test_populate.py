@@ -0,0 +1,108 @@
+import hashlib
+import io
+
+import pytest
+from upath import UPath
+
+from pytest_servers.factory import TempUPathFactory
+from pytest_servers.populate import populate
+
+
+@pytest.fixture
+def s3_factory(s3_server):
+    factory = TempUPathFactory(s3_client_kwargs=s3_server)
+    yield factory
+    factory.close()
+
+
+@pytest.fixture
+def source(tmp_path):
+    local = tmp_path / "source"
+    local.write_bytes(b"from a file")
+    return local
+
+
+def _files(source):
+    return {
+        "bytes": b"bytes",
+        "dir/file": source,
+        "dir/str": str(source),
+        "dir/sub/generator": (bytes([i]) * 3 for i in range(3)),
+        "fileobj": io.BytesIO(b"file object"),
+    }
+
+
+def _check(path):
+    assert (path / "bytes").read_bytes() == b"bytes"
+    assert (path / "dir" / "file").read_bytes() == b"from a file"
+    assert (path / "dir" / "str").read_bytes() == b"from a file"
+    assert (path / "dir" / "sub" / "generator").read_bytes() == (
+        b"\x00\x00\x00\x01\x01\x01\x02\x02\x02"
+    )
+    assert (path / "fileobj").read_bytes() == b"file object"
+
+
+@pytest.mark.parametrize("fs", ["local", "memory"])
+def test_populate(tmp_upath_factory, source, fs):
+    path = tmp_upath_factory.mktemp(fs)
+    tmp_upath_factory.populate(path, _files(source))
+    _check(path)
+
+
+def test_populate_s3(s3_factory, source):
+    path = s3_factory.mktemp("s3")
+    s3_factory.populate(path, _files(source))
+    _check(path)
+
+
+def test_populate_iterable_in_chunks(s3_factory):
+    path = s3_factory.mktemp("s3")
+    consumed = []
+
+    def files():
+        for i in range(25):
+            consumed.append(i)
+            yield f"{i:02}", str(i).encode()
+
+    populate(path, files(), chunk_size=10)
+    assert len(consumed) == 25
+    assert sorted(p.name for p in path.iterdir()) == [f"{i:02}" for i in range(25)]
+    assert (path / "24").read_bytes() == b"24"
+
+
+@pytest.mark.parametrize("isolation", ["bucket", "prefix"])
+def test_populate_moto(s3_server, isolation):
+    factory = TempUPathFactory(s3_client_kwargs=s3_server, isolation=isolation)
+    path = factory.mktemp("s3")
+    # listed before, the keys must not be hidden by the listing cache
+    assert path.fs.find(path.path) == []
+
+    keys = (f"dir/{i:04d}" for i in range(1000))
+    assert factory.populate_s3(path, keys, size=3) == 1000
+
+    assert len(path.fs.find(path.path)) == 1000
+    assert (path / "dir" / "0999").read_bytes() == b"\0\0\0"
+    etag = hashlib.md5(b"\0\0\0").hexdigest()
+    assert path.fs.info((path / "dir" / "0000").path)["ETag"] == f'"{etag}"'
+    (path / "dir" / "0001").unlink()
+    (path / "dir" / "0002").write_bytes(b"new")
+    assert (path / "dir" / "0002").read_bytes() == b"new"
+    assert (path / "dir" / "0003").read_bytes() == b"\0\0\0"
+    factory.close()
+
+
+def test_populate_moto_versioned(s3_factory):
+    path = s3_factory.mktemp("s3", version_aware=True)
+    assert s3_factory.populate_s3(path, ["a", "a", "b"]) == 3
+    versions = path.fs.object_version_info((path / "a").path)
+    assert len({version["VersionId"] for version in versions}) == 2
+
+
+def test_populate_moto_unsupported(s3_factory, s3_server, tmp_upath_factory):
+    with pytest.raises(ValueError, match="only supports s3 paths"):
+        tmp_upath_factory.populate_s3(tmp_upath_factory.mktemp("memory"), ["a"])
+    path = UPath(
+        "s3://pytest-servers-missing", **s3_factory.mktemp("s3").storage_options
+    )
+    with pytest.raises(ValueError, match="not in a moto backend"):
+        s3_factory.populate_s3(path, ["a"])
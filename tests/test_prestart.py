@@ -0,0 +1,49 @@
+import pytest
+
+from pytest_servers.prestart import prestart_remotes
+
+pytest_plugins = ["pytester"]
+
+
+def test_prestart_s3(pytester):
+    pytester.makepyfile(
+        """
+        from pytest_servers.prestart import Prestart
+
+        def test_prestarted(request):
+            prestart = request.config.pluginmanager.get_plugin(Prestart.name)
+            assert "s3_server" in prestart._futures
+
+        def test_s3(tmp_s3_path, request):
+            prestart = request.config.pluginmanager.get_plugin(Prestart.name)
+            assert "s3_server" not in prestart._futures
+            (tmp_s3_path / "foo").write_text("foo")
+        """,
+    )
+    result = pytester.runpytest("--servers-prestart=s3")
+    result.assert_outcomes(passed=2)
+
+
+@pytest.mark.parametrize(
+    ("test", "remotes"),
+    [
+        ("def test_foo(tmp_path): pass", set()),
+        ("def test_foo(tmp_s3_path, azurite): pass", {"s3", "azure"}),
+        ("async def test_foo(async_tmp_gcs_path): pass", {"gcs"}),
+        (
+            "import pytest\n"
+            "@pytest.mark.parametrize('tmp_upath', ['local', 'gs'], indirect=True)\n"
+            "def test_foo(tmp_upath): pass",
+            {"gcs"},
+        ),
+    ],
+)
+def test_prestart_auto(pytester, test, remotes):
+    pytester.makepyfile(test)
+    items, _ = pytester.inline_genitems("--servers-prestart=auto")
+    assert prestart_remotes(items[0].config, items) == remotes
+
+
+def test_prestart_unknown_remote(pytester):
+    result = pytester.runpytest("--servers-prestart=s3,hdfs")
+    result.stderr.fnmatch_lines(["*unknown remotes*hdfs*"])
@@ -0,0 +1,123 @@
+import time
+
+import boto3
+import pytest
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionClosedError
+
+from pytest_servers.factory import TempUPathFactory
+from pytest_servers.proxy import FaultProxy, Faults
+
+pytest_plugins = ["pytester"]
+
+
+@pytest.fixture
+def s3_factory(s3_server):
+    factory = TempUPathFactory(s3_client_kwargs=s3_server)
+    yield factory
+    factory.close()
+
+
+def s3_client(s3_server, proxy):
+    return boto3.client(
+        "s3",
+        config=Config(retries={"total_max_attempts": 1}),
+        **proxy.proxied(s3_server),
+    )
+
+
+def test_proxied_path(s3_factory, s3_server):
+    faults = Faults(latency=0.05)
+    path = s3_factory.mktemp("s3", faults=faults)
+    proxy = s3_factory.proxy("s3", faults)
+    assert path.storage_options["endpoint_url"] == proxy.endpoint_url
+    assert path.storage_options["endpoint_url"] != s3_server["endpoint_url"]
+
+    start = time.perf_counter()
+    (path / "foo").write_text("foo")
+    assert time.perf_counter() - start >= 0.05
+    assert (path / "foo").read_text() == "foo"
+    # shared by the paths with the same faults
+    assert s3_factory.mktemp("s3", faults=faults).fs is path.fs
+
+
+def test_latency_range(s3_factory, s3_server):
+    proxy = s3_factory.proxy("s3", Faults(latency=(0.02, 0.04)))
+    client = s3_client(s3_server, proxy)
+    start = time.perf_counter()
+    client.list_buckets()
+    assert time.perf_counter() - start >= 0.02
+
+
+@pytest.mark.parametrize(
+    ("status", "code"),
+    [(503, "SlowDown"), (429, "TooManyRequests")],
+)
+def test_errors(s3_factory, s3_server, status, code):
+    proxy = s3_factory.proxy("s3", Faults(error_rate=1, error_status=status))
+    with pytest.raises(ClientError) as exc_info:
+        s3_client(s3_server, proxy).list_buckets()
+    assert exc_info.value.response["Error"]["Code"] == code
+    assert exc_info.value.response["ResponseMetadata"]["HTTPStatusCode"] == status
+
+
+def test_resets(s3_factory, s3_server):
+    proxy = s3_factory.proxy("s3", Faults(reset_rate=1))
+    with pytest.raises(ConnectionClosedError):
+        s3_client(s3_server, proxy).list_buckets()
+
+
+def test_retried_faults(s3_factory):
+    faults = Faults(error_rate=0.3, reset_rate=0.2, seed=0)
+    path = s3_factory.mktemp("s3", faults=faults)
+    for i in range(10):
+        (path / str(i)).write_bytes(b"x")
+    assert len(list(path.iterdir())) == 10
+
+
+def test_bandwidth(s3_factory):
+    path = s3_factory.mktemp("s3", faults=Faults(bandwidth=1_000_000))
+    data = b"x" * 200_000
+    start = time.perf_counter()
+    (path / "foo").write_bytes(data)
+    assert time.perf_counter() - start >= 0.2
+    start = time.perf_counter()
+    assert (path / "foo").read_bytes() == data
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_faults_on_local_path(tmp_upath_factory):
+    with pytest.raises(ValueError, match="faults are not supported"):
+        tmp_upath_factory.mktemp("local", faults=Faults(latency=1))
+
+
+def test_proxied_connection_string():
+    with FaultProxy("http://localhost:10000/devstoreaccount1") as proxy:
+        connection_string = (
+            "AccountName=devstoreaccount1;"
+            "BlobEndpoint=http://localhost:10000/devstoreaccount1;"
+        )
+        assert proxy.proxied(connection_string) == (
+            "AccountName=devstoreaccount1;"
+            f"BlobEndpoint=http://127.0.0.1:{proxy.port}/devstoreaccount1;"
+        )
+
+
+def test_marker(pytester):
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.servers_faults(latency=0.01)
+        def test_faults(s3_server, tmp_s3_path):
+            endpoint_url = tmp_s3_path.storage_options["endpoint_url"]
+            assert endpoint_url != s3_server["endpoint_url"]
+            (tmp_s3_path / "foo").write_text("foo")
+
+        def test_no_faults(s3_server, tmp_s3_path):
+            endpoint_url = tmp_s3_path.storage_options["endpoint_url"]
+            assert endpoint_url == s3_server["endpoint_url"]
+        """,
+    )
+    result = pytester.runpytest("-p", "no:xdist")
+    result.assert_outcomes(passed=2)
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from pytest_servers.readiness import (
+    backoff_delays,
+    wait_for,
+    wait_for_container_start,
+    wait_for_log_line,
+)
+
+
+class FakeStream:
+    """Docker stream that blocks after its items until it is closed."""
+
+    def __init__(self, items):
+        self._items = iter(items)
+        self._closed = threading.Event()
+
+    def __iter__(self):
+        yield from self._items
+        self._closed.wait()
+        raise ConnectionError
+
+    def close(self):
+        self._closed.set()
+
+
+class FakeClient:
+    def __init__(self, events):
+        self._events = events
+
+    def events(self, **kwargs):
+        return self._events
+
+
+class FakeContainer:
+    id = "abc"
+    name = "fake"
+
+    def __init__(self, statuses, logs=(), events=()):
+        self._statuses = iter(statuses)
+        self._logs = logs
+        self.client = FakeClient(FakeStream(events))
+        self.status = None
+
+    def reload(self):
+        self.status = next(self._statuses)
+
+    def logs(self, stream, follow):
+        return FakeStream(self._logs)
+
+
+def test_backoff_delays():
+    delays = backoff_delays(initial=0.01, maximum=0.08)
+    values = [next(delays) for _ in range(6)]
+    bounds = [0.01, 0.02, 0.04, 0.08, 0.08, 0.08]
+    for value, bound in zip(values, bounds, strict=True):
+        assert bound / 2 <= value <= bound
+
+
+def test_wait_for():
+    tries = iter([False, ConnectionError, False, True])
+
+    def probe():
+        result = next(tries)
+        if result is ConnectionError:
+            raise result
+        return result
+
+    start = time.perf_counter()
+    wait_for(probe, timeout=5)
+    assert time.perf_counter() - start < 0.5
+
+
+def test_wait_for_timeout():
+    with pytest.raises(TimeoutError):
+        wait_for(lambda: False, timeout=0.05)
+
+
+def test_wait_for_container_already_running():
+    wait_for_container_start(FakeContainer(["running"]), timeout=1)
+
+
+def test_wait_for_container_start_event():
+    container = FakeContainer(
+        ["created", "running"],
+        events=[{"status": "start", "id": "abc"}],
+    )
+    wait_for_container_start(container, timeout=1)
+    assert container.status == "running"
+
+
+def test_wait_for_container_dies():
+    container = FakeContainer(["created"], events=[{"status": "die", "id": "abc"}])
+    with pytest.raises(RuntimeError, match="exited"):
+        wait_for_container_start(container, timeout=1)
+
+
+def test_wait_for_container_start_timeout():
+    with pytest.raises(TimeoutError):
+        wait_for_container_start(FakeContainer(["created"]), timeout=0.05)
+
+
+def test_wait_for_log_line():
+    container = FakeContainer([], logs=[b"starting\nserver st", b"arted at :4443\n"])
+    wait_for_log_line(container, r"server started at", timeout=1)
+
+
+def test_wait_for_log_line_timeout():
+    container = FakeContainer([], logs=[b"starting\n"])
+    with pytest.raises(TimeoutError):
+        wait_for_log_line(container, r"server started at", timeout=0.05)
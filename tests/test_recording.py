@@ -0,0 +1,144 @@
+import pytest
+
+from pytest_servers.recording import RequestLog, StorageRequest, classify
+
+pytest_plugins = ["pytester"]
+
+
+@pytest.mark.parametrize(
+    ("method", "url", "headers", "operation"),
+    [
+        ("GET", "/", {}, "ListBuckets"),
+        ("GET", "/bucket?list-type=2&prefix=a", {}, "ListObjectsV2"),
+        ("GET", "/bucket?versions", {}, "ListObjectVersions"),
+        ("GET", "/bucket", {}, "ListObjects"),
+        ("HEAD", "/bucket", {}, "HeadBucket"),
+        ("PUT", "/bucket", {}, "CreateBucket"),
+        ("PUT", "/bucket?versioning", {}, "PutBucketVersioning"),
+        ("POST", "/bucket?delete", {}, "DeleteObjects"),
+        ("HEAD", "/bucket/a/b", {}, "HeadObject"),
+        ("GET", "/bucket/a/b", {}, "GetObject"),
+        ("PUT", "/bucket/a/b", {}, "PutObject"),
+        ("PUT", "/bucket/a/b", {"x-amz-copy-source": "bucket/c"}, "CopyObject"),
+        ("PUT", "/bucket/a?partNumber=1&uploadId=x", {}, "UploadPart"),
+        ("POST", "/bucket/a?uploads", {}, "CreateMultipartUpload"),
+        ("POST", "/bucket/a?uploadId=x", {}, "CompleteMultipartUpload"),
+        ("DELETE", "/bucket/a", {}, "DeleteObject"),
+    ],
+)
+def test_classify_s3(method, url, headers, operation):
+    assert classify("s3", method, url, headers) == operation
+
+
+@pytest.mark.parametrize(
+    ("method", "url", "operation"),
+    [
+        ("GET", "/account?comp=list", "ListContainers"),
+        ("PUT", "/account/container?restype=container", "CreateContainer"),
+        ("GET", "/account/container?restype=container&comp=list", "ListBlobs"),
+        ("HEAD", "/account/container/a/b", "GetBlobProperties"),
+        ("GET", "/account/container/a/b", "GetBlob"),
+        ("PUT", "/account/container/a", "PutBlob"),
+        ("PUT", "/account/container/a?comp=block&blockid=x", "PutBlock"),
+        ("PUT", "/account/container/a?comp=blocklist", "PutBlockList"),
+        ("DELETE", "/account/container/a", "DeleteBlob"),
+    ],
+)
+def test_classify_azure(method, url, operation):
+    assert classify("azure", method, url, {}) == operation
+
+
+@pytest.mark.parametrize(
+    ("method", "url", "operation"),
+    [
+        ("GET", "/storage/v1/b?project=p", "buckets.list"),
+        ("POST", "/storage/v1/b?project=p", "buckets.insert"),
+        ("GET", "/storage/v1/b/bucket", "buckets.get"),
+        ("GET", "/storage/v1/b/bucket/o?prefix=a", "objects.list"),
+        ("GET", "/storage/v1/b/bucket/o/a%2Fb", "objects.get"),
+        ("GET", "/download/storage/v1/b/bucket/o/a?alt=media", "objects.get"),
+        ("POST", "/upload/storage/v1/b/bucket/o?uploadType=media", "objects.insert"),
+        ("DELETE", "/storage/v1/b/bucket/o/a", "objects.delete"),
+        ("POST", "/storage/v1/b/bucket/o/a/rewriteTo/b/bucket/o/b", "objects.rewrite"),
+        ("POST", "/storage/v1/b/bucket/o/a/compose", "objects.compose"),
+        ("POST", "/batch/storage/v1", "batch"),
+    ],
+)
+def test_classify_gcs(method, url, operation):
+    assert classify("gcs", method, url, {}) == operation
+
+
+def test_request_log():
+    log = RequestLog()
+    for operation, method in [("HeadObject", "HEAD"), ("GetObject", "GET")] * 2:
+        log.append(StorageRequest("s3", operation, method, "/", 200, 1, 10, 0.1))
+    assert len(log) == 4
+    assert log.count("HeadObject") == log.count("HEAD") == 2
+    assert log.bytes_received("GET") == 20
+    assert log.operations() == {"HeadObject": 2, "GetObject": 2}
+    assert log.check_budget({"HEAD": 2, "total": 3}) == ["total: 4 requests > 3"]
+
+
+def test_storage_requests(pytester):
+    pytester.makepyfile(
+        """
+        def test_requests(tmp_s3_path, storage_requests):
+            (tmp_s3_path / "foo").write_text("foo")
+            tmp_s3_path.fs.invalidate_cache()
+            assert [p.name for p in tmp_s3_path.iterdir()] == ["foo"]
+
+            assert storage_requests.count("PutObject") == 1
+            assert storage_requests.bytes_sent("PutObject") == 3
+            assert storage_requests.count("ListObjectsV2") >= 1
+            # creating the bucket is not recorded
+            assert storage_requests.count("CreateBucket") == 0
+
+        def test_factory(tmp_upath_factory, storage_requests):
+            path = tmp_upath_factory.mktemp("s3")
+            (path / "foo").write_text("foo")
+            assert storage_requests.count("PutObject") == 1
+        """,
+    )
+    result = pytester.runpytest("-p", "no:xdist")
+    result.assert_outcomes(passed=2)
+
+
+def test_storage_budget(pytester):
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.storage_budget(PutObject=1)
+        def test_within_budget(tmp_s3_path):
+            (tmp_s3_path / "foo").write_text("foo")
+
+        @pytest.mark.storage_budget(HEAD=0, total=1)
+        def test_over_budget(tmp_s3_path):
+            (tmp_s3_path / "foo").write_text("foo")
+            (tmp_s3_path / "foo").exists()
+        """,
+    )
+    result = pytester.runpytest("-p", "no:xdist")
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines(
+        [
+            "*storage request budget exceeded:",
+            "*HEAD: 1 requests > 0",
+            "*total: 2 requests > 1",
+        ],
+    )
+
+
+def test_storage_budget_without_paths(pytester):
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.storage_budget(total=0)
+        def test_foo(s3_server):
+            pass
+        """,
+    )
+    result = pytester.runpytest("-p", "no:xdist")
+    result.assert_outcomes(errors=1)
+    result.stdout.fnmatch_lines(["*storage_budget requires a temporary path*"])
@@ -0,0 +1,129 @@
+import pytest
+
+from pytest_servers.s3 import start_s3_server
+
+pytest_plugins = ["pytester"]
+
+
+def test_inprocess_backend(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.fixture(scope="session")
+        def s3_server_config():
+            return {"backend": "inprocess"}
+        """,
+    )
+    pytester.makepyfile(
+        """
+        import boto3
+        import pytest
+
+        def test_s3(s3_server, tmp_s3_path):
+            assert s3_server["endpoint_url"] is None
+            (tmp_s3_path / "dir" / "foo").write_text("foo")
+            assert (tmp_s3_path / "dir" / "foo").read_text() == "foo"
+            assert [p.name for p in (tmp_s3_path / "dir").iterdir()] == ["foo"]
+
+            client = boto3.client("s3", **s3_server)
+            bucket = tmp_s3_path.path.strip("/")
+            keys = client.list_objects_v2(Bucket=bucket)["Contents"]
+            assert [key["Key"] for key in keys] == ["dir/foo"]
+
+        def test_s3_versioned(tmp_s3_path, versioning):
+            foo = tmp_s3_path / "foo"
+            foo.write_text("foo")
+            foo.write_text("bar")
+            assert len(tmp_s3_path.fs.object_version_info(foo.path)) == 2
+        """,
+    )
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=2)
+
+
+def test_inprocess_backend_async(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.fixture(scope="session")
+        def s3_server_config():
+            return {"backend": "inprocess"}
+        """,
+    )
+    pytester.makepyfile(
+        """
+        import boto3
+        import pytest
+
+        @pytest.mark.asyncio
+        async def test_sync_calls(s3_server, tmp_upath_factory):
+            # botocore clients, from a running event loop
+            path = tmp_upath_factory.mktemp("s3", version_aware=True)
+            (path / "foo").write_text("foo")
+            client = boto3.client("s3", **s3_server)
+            bucket = path.path.strip("/")
+            keys = client.list_objects_v2(Bucket=bucket)["Contents"]
+            assert [key["Key"] for key in keys] == ["foo"]
+
+            # and aiobotocore ones
+            apath = await tmp_upath_factory.amktemp("s3")
+            await apath.fs._pipe_file((apath / "foo").path, b"foo")
+            assert await apath.fs._cat_file((apath / "foo").path) == b"foo"
+            await tmp_upath_factory.aclose()
+        """,
+    )
+    result = pytester.runpytest("-p", "no:xdist", "-W", "error::RuntimeWarning")
+    result.assert_outcomes(passed=1)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="backend"):
+        start_s3_server({"backend": "cloud"})
+
+
+def test_process_backend(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.fixture(scope="session")
+        def s3_server_config():
+            return {"backend": "process", "verbose": False}
+        """,
+    )
+    pytester.makepyfile(
+        """
+        import sys
+
+        def test_s3(s3_server, tmp_s3_path):
+            (tmp_s3_path / "foo").write_text("foo")
+            assert (tmp_s3_path / "foo").read_text() == "foo"
+            # moto's server runs out of the test process
+            assert "moto.moto_server.threaded_moto_server" not in sys.modules
+        """,
+    )
+    # a fresh interpreter, for sys.modules
+    result = pytester.runpytest_subprocess("-p", "no:xdist")
+    result.assert_outcomes(passed=1)
+
+
+def test_shared_process_backend(pytester):
+    pytester.makeconftest(
+        """
+        import pytest
+
+        @pytest.fixture(scope="session")
+        def s3_server_config():
+            return {"backend": "process", "shared": True, "verbose": False}
+        """,
+    )
+    pytester.makepyfile(
+        """
+        def test_s3(tmp_s3_path):
+            (tmp_s3_path / "foo").write_text("foo")
+        """,
+    )
+    result = pytester.runpytest("-n", "2")
+    result.assert_outcomes(passed=1)
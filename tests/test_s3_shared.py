@@ -0,0 +1,75 @@
+import json
+import subprocess
+import sys
+
+import pytest
+import requests
+
+from pytest_servers.s3 import shared_s3_server
+
+
+def test_shared_s3_server(tmp_path):
+    with shared_s3_server(tmp_path, "gw0", {"verbose": False}) as endpoint_url:
+        (state_file,) = tmp_path.glob("s3_server-*.json")
+        with shared_s3_server(tmp_path, "gw1", {"verbose": False}) as other_url:
+            assert other_url == endpoint_url
+            state = json.loads(state_file.read_text())
+            assert list(state["workers"]) == ["gw0", "gw1"]
+
+        # the server keeps running while a worker is still attached
+        assert requests.get(f"{endpoint_url}/moto-api/", timeout=5).ok
+
+    assert not state_file.exists()
+    with pytest.raises(requests.ConnectionError):
+        requests.get(f"{endpoint_url}/moto-api/", timeout=5)
+
+
+def test_shared_s3_server_is_keyed_by_config(tmp_path):
+    with (
+        shared_s3_server(tmp_path, "gw0", {"verbose": False}) as endpoint_url,
+        shared_s3_server(
+            tmp_path,
+            "gw0",
+            {"ip_address": "0.0.0.0", "verbose": False},
+        ) as url,
+    ):
+        assert endpoint_url != url
+
+
+def stopped(endpoint_url):
+    try:
+        requests.get(f"{endpoint_url}/moto-api/", timeout=5)
+    except requests.ConnectionError:
+        return True
+    return False
+
+
+def test_shared_s3_server_ignores_dead_workers(tmp_path):
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    with shared_s3_server(tmp_path, "gw0", {"verbose": False}) as endpoint_url:
+        (state_file,) = tmp_path.glob("s3_server-*.json")
+        state = json.loads(state_file.read_text())
+        # a worker that crashed without detaching
+        state["workers"]["gw1"] = process.pid
+        state_file.write_text(json.dumps(state))
+
+    assert not state_file.exists()
+    assert stopped(endpoint_url)
+
+
+def test_shared_s3_server_state_removed(tmp_path):
+    with shared_s3_server(tmp_path, "gw0", {"verbose": False}) as endpoint_url:
+        (state_file,) = tmp_path.glob("s3_server-*.json")
+        state_file.unlink()
+    assert stopped(endpoint_url)
+
+
+def test_shared_s3_server_replaced(tmp_path):
+    with shared_s3_server(tmp_path, "gw0", {"verbose": False}) as endpoint_url:
+        (state_file,) = tmp_path.glob("s3_server-*.json")
+        # restarted by another worker, which the state now belongs to
+        state = json.loads(state_file.read_text())
+        state_file.write_text(json.dumps({**state, "pid": 0, "workers": {}}))
+    assert stopped(endpoint_url)
+    assert state_file.exists()
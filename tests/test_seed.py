@@ -0,0 +1,87 @@
+import pytest
+
+from pytest_servers.factory import TempUPathFactory
+from pytest_servers.seed import seed_digest
+
+
+@pytest.fixture
+def seed_dir(tmp_path):
+    seed = tmp_path / "seed"
+    (seed / "dir").mkdir(parents=True)
+    (seed / "foo").write_text("foo")
+    (seed / "dir" / "bar").write_text("bar")
+    return seed
+
+
+@pytest.fixture
+def s3_factory(s3_server):
+    factory = TempUPathFactory(s3_client_kwargs=s3_server)
+    yield factory
+    factory.close()
+
+
+def _contents(path):
+    return {
+        p.relative_to(path).as_posix(): p.read_text()
+        for p in path.rglob("*")
+        if p.is_file()
+    }
+
+
+def test_seed_digest(seed_dir):
+    digest = seed_digest(seed_dir)
+    assert digest == seed_digest(seed_dir)
+    (seed_dir / "foo").write_text("changed")
+    assert digest != seed_digest(seed_dir)
+
+
+def test_seed_local(tmp_upath_factory, seed_dir):
+    path = tmp_upath_factory.mktemp(seed=seed_dir)
+    other = tmp_upath_factory.mktemp(seed=seed_dir)
+    assert path != other
+    assert _contents(path) == {"foo": "foo", "dir/bar": "bar"}
+
+    # the clones are modified in place, even by root
+    (path / "foo").write_text("changed")
+    with (path / "dir" / "bar").open("a") as f:
+        f.write("changed")
+    assert (other / "foo").read_text() == "foo"
+    assert _contents(tmp_upath_factory.mktemp(seed=seed_dir)) == _contents(other)
+
+
+def test_seed_callable(tmp_upath_factory):
+    calls = []
+
+    def seed(directory):
+        calls.append(directory)
+        (directory / "foo").write_text("foo")
+
+    for _ in range(2):
+        path = tmp_upath_factory.mktemp("memory", seed=seed)
+        assert (path / "foo").read_text() == "foo"
+    assert len(calls) == 1
+
+
+def test_seed_memory(seed_dir):
+    factory = TempUPathFactory()
+    path = factory.mktemp("memory", seed=seed_dir)
+    other = factory.mktemp("memory", seed=seed_dir)
+    assert (path / "foo").read_text() == "foo"
+    assert (path / "dir" / "bar").read_text() == "bar"
+
+    (path / "foo").write_text("changed")
+    assert (other / "foo").read_text() == "foo"
+    factory.close()
+
+
+def test_seed_s3(s3_factory, seed_dir):
+    path = s3_factory.mktemp("s3", seed=seed_dir)
+    other = s3_factory.mktemp("s3", seed=seed_dir, isolation="prefix")
+    assert (path / "foo").read_text() == "foo"
+    assert (path / "dir" / "bar").read_text() == "bar"
+    assert (other / "dir" / "bar").read_text() == "bar"
+
+    (path / "foo").write_text("changed")
+    assert (other / "foo").read_text() == "foo"
+    seed_bucket = f"pytest-servers-seed-{seed_digest(seed_dir)[:16]}"
+    assert path.fs.exists(f"{seed_bucket}/.pytest-servers-seed")
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from pytest_servers.timing import Timings, percentile
+
+pytest_plugins = ["pytester"]
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3
+
+
+def test_timings_summary():
+    timings = Timings()
+    assert not timings
+    for value in (0.3, 0.1, 0.2):
+        timings.record("mktemp.s3", value)
+    with timings.measure("s3_server.ready"):
+        pass
+    timings.merge({"mktemp.s3": [0.4], "azurite.ready": [1.0]})
+
+    summary = {row.phase: row for row in timings.summary()}
+    assert list(summary) == ["azurite.ready", "mktemp.s3", "s3_server.ready"]
+    row = summary["mktemp.s3"]
+    assert row.calls == 4
+    assert row.total == pytest.approx(1.0)
+    assert row.p50 == 0.2
+    assert row.p99 == 0.4
+
+
+def test_timings_report(pytester):
+    pytester.makepyfile(
+        """
+        def test_memory(tmp_memory_path):
+            pass
+        """,
+    )
+    result = pytester.runpytest(
+        "-p",
+        "no:xdist",
+        "--servers-timings",
+        "--servers-timings-json=timings.json",
+    )
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(
+        [
+            "*pytest-servers timings*",
+            "phase*count*total*p50*p95*p99",
+            "mktemp.memory*1*",
+        ],
+    )
+    data = json.loads((pytester.path / "timings.json").read_text())
+    assert len(data["mktemp.memory"]) >= 1
@@ -0,0 +1,62 @@
+import pytest
+
+pytest_plugins = ["pytester"]
+
+
+@pytest.fixture
+def broken_azurite(pytester, tmp_path):
+    attempts = tmp_path / "attempts"
+    pytester.makeconftest(
+        f"""
+        import os
+        import time
+
+        import pytest
+
+        from pytest_servers.exceptions import HealthcheckTimeout
+
+        @pytest.fixture(autouse=True)
+        def second_worker_waits(tmp_path_factory):
+            # the failure of the first worker is shared through the session dir
+            if os.environ.get("PYTEST_XDIST_WORKER") == "gw1":
+                root = tmp_path_factory.getbasetemp().parent
+                deadline = time.monotonic() + 30
+                while not (root / "pytest-servers-azurite.failed").exists():
+                    assert time.monotonic() < deadline
+                    time.sleep(0.1)
+
+        @pytest.fixture(scope="session")
+        def azurite():
+            with open({str(attempts)!r}, "a") as f:
+                f.write("x")
+            raise HealthcheckTimeout("azurite", "container logs: bad image")
+        """,
+    )
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.mark.parametrize("i", range(4))
+        def test_azure(tmp_azure_path, i):
+            pass
+        """,
+    )
+    return attempts
+
+
+def test_failed_remote_is_not_retried(pytester, broken_azurite):
+    result = pytester.runpytest("-p", "no:xdist")
+    result.assert_outcomes(errors=4)
+    assert broken_azurite.read_text() == "x"
+    result.stdout.fnmatch_lines(
+        [
+            "*azure: mock remote unavailable, its setup failed earlier*",
+            "*container logs: bad image*",
+        ],
+    )
+
+
+def test_failed_remote_is_shared_by_workers(pytester, broken_azurite):
+    result = pytester.runpytest("-n", "2")
+    result.assert_outcomes(errors=4)
+    assert broken_azurite.read_text() == "x"